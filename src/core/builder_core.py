@@ -14,6 +14,15 @@ from .builder_decorators import LANGUAGE_MAP, safe_file_operation
 from .builder_languages import get_parser
 from .index import CodeIndex, SymbolInfo
 
+# 扫描时跳过的目录 - 构建与增量指纹共用
+SKIP_DIRS = frozenset(
+    {".venv", "__pycache__", ".git", "node_modules", "target", "build"}
+)
+
+# V语言定义行: "name :: ..." - 模块级编译一次，逐行不再查re内部缓存
+_VLANG_FUNCTION_RE = re.compile(r"^\w+\s*::.*\(")
+_VLANG_STRUCT_RE = re.compile(r"^\w+\s*::.*struct")
+
 
 class IndexBuilder:
     """极简索引构建器 - 零抽象层"""
@@ -56,12 +65,9 @@ class IndexBuilder:
         if not base.exists():
             return files
 
-        # 支持的扩展名
-        skip_dirs = {".venv", "__pycache__", ".git", "node_modules", "target", "build"}
-
         for root, dirs, filenames in os.walk(base):
             # 跳过不需要的目录
-            dirs[:] = [d for d in dirs if d not in skip_dirs]
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
 
             for filename in filenames:
                 if "." in filename:
@@ -151,14 +157,17 @@ class IndexBuilder:
             for line_num, line in enumerate(lines, 1):
                 line = line.strip()
 
+                # 两种定义都含"::"，多数行一次包含测试即可跳过正则
+                is_definition = "::" in line
+
                 # 函数定义
-                if re.match(r"^\w+\s*::.*\(", line):
-                    func_name = re.split(r"\s*::", line)[0].strip()
+                if is_definition and _VLANG_FUNCTION_RE.match(line):
+                    func_name = line.partition("::")[0].strip()
                     symbols["functions"].append(func_name)
 
                 # 类型定义
-                elif re.match(r"^\w+\s*::.*struct", line):
-                    type_name = re.split(r"\s*::", line)[0].strip()
+                elif is_definition and _VLANG_STRUCT_RE.match(line):
+                    type_name = line.partition("::")[0].strip()
                     symbols["types"].append(type_name)
 
                 # 导入
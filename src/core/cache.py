@@ -69,6 +69,8 @@ class OptimizedFileCache:
         self, max_size: Optional[int] = None, max_memory_mb: Optional[int] = None
     ):
         self._cache: Dict[str, List[str]] = {}
+        # 行的换行拼接文本: 路径 -> [行列表, 文本, 小写文本, 计入内存的大小]，随行缓存失效
+        self._texts: Dict[str, List[Any]] = {}
         self._file_hashes: Dict[str, str] = {}
         self._access_times: Dict[str, float] = {}
 
@@ -146,6 +148,34 @@ class OptimizedFileCache:
 
         return self._cache.get(normalized_path, [])
 
+    def get_file_text(
+        self, file_path: str, lower: bool = False
+    ) -> Tuple[List[str], Optional[str]]:
+        """获取文件行及其换行拼接文本 - 整段搜索用，lower时返回小写文本
+
+        文本与行列表一起缓存，文件重新加载或被淘汰时一并丢弃；
+        行内含换行时行号无法对齐，文本为None。
+        """
+        lines = self.get_file_lines(file_path)
+        normalized_path = str(Path(file_path))
+        entry = self._texts.get(normalized_path)
+        if entry is None or entry[0] is not lines:
+            if entry is not None:
+                self._current_memory -= entry[3]
+            text: Optional[str] = "\n".join(lines)
+            if text.count("\n") != max(len(lines) - 1, 0):
+                text = None
+            entry = [lines, text, None, len(text) if text else 0]
+            self._texts[normalized_path] = entry
+            self._current_memory += entry[3]
+        if not lower or entry[1] is None:
+            return lines, entry[1]
+        if entry[2] is None:
+            entry[2] = entry[1].lower()
+            entry[3] += len(entry[2])
+            self._current_memory += len(entry[2])
+        return lines, entry[2]
+
     def _should_reload_file(self, file_path: str) -> bool:
         """检查文件是否需要重新加载"""
         if file_path not in self._cache:
@@ -221,6 +251,10 @@ class OptimizedFileCache:
             memory_size = sum(len(line.encode("utf-8")) for line in lines)
             self._current_memory -= memory_size
 
+            text_entry = self._texts.pop(file_path, None)
+            if text_entry is not None:
+                self._current_memory -= text_entry[3]
+
             # 清理所有相关数据
             del self._cache[file_path]
             self._file_hashes.pop(file_path, None)
@@ -561,6 +595,7 @@ class OptimizedFileCache:
     def clear_cache(self) -> None:
         """清空缓存 - 完整重置"""
         self._cache.clear()
+        self._texts.clear()
         self._file_hashes.clear()
         self._access_times.clear()
         self._access_counts.clear()
@@ -6,14 +6,115 @@ Bad programmers worry about the code. Good programmers worry about data structur
 """
 
 import os
+import struct
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 from .builder import IndexBuilder, safe_file_operation
+from .builder_core import SKIP_DIRS
 from .index import CodeIndex
 
 
+def compute_tree_fingerprint(root_path: str, extensions: Iterable[str]) -> int:
+    """
+    目录树指纹 - 一次遍历获取(path, mtime_ns, size)
+
+    指纹不变即无文件增删改，可跳过整个增量更新
+    """
+    import xxhash
+
+    extensions = set(extensions)
+    entries = []
+    for root, dirs, filenames in os.walk(root_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for filename in filenames:
+            if os.path.splitext(filename)[1].lower() not in extensions:
+                continue
+            file_path = os.path.join(root, filename)
+            try:
+                stat_info = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((file_path, stat_info.st_mtime_ns, stat_info.st_size))
+
+    entries.sort()
+    hasher = xxhash.xxh3_64()
+    for file_path, mtime_ns, size in entries:
+        hasher.update(file_path.encode("utf-8", "surrogateescape"))
+        hasher.update(struct.pack("qQ", mtime_ns, size))
+    return int(hasher.intdigest())
+
+
+# 只读访问产生的事件，不代表目录内容变化
+_READ_ONLY_EVENTS = frozenset({"opened", "closed_no_write"})
+
+
+class TreeChangeWatcher:
+    """
+    目录变更计数器 - watchdog事件到达时递增epoch
+
+    epoch不变即目录无变更，刷新时无需再遍历stat整个目录树
+    """
+
+    def __init__(self, root_path: str):
+        self.root_path = root_path
+        self.epoch = 0
+        self._observer: Optional[Any] = None
+
+    @property
+    def active(self) -> bool:
+        return self._observer is not None
+
+    def start(self) -> bool:
+        """启动监听 - watchdog不可用或系统限制时返回False"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event: Any) -> None:
+                if event.event_type in _READ_ONLY_EVENTS:
+                    return
+                if SKIP_DIRS.isdisjoint(str(event.src_path).split(os.sep)):
+                    watcher.epoch += 1
+
+        try:
+            observer = Observer()
+            observer.schedule(_Handler(), self.root_path, recursive=True)
+            observer.daemon = True
+            observer.start()
+        except Exception:
+            # inotify监听数上限等 - 回退到指纹遍历
+            return False
+
+        self._observer = observer
+        return True
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+
+_tree_watcher: Optional[TreeChangeWatcher] = None
+
+
+def get_tree_change_epoch(root_path: str) -> Optional[int]:
+    """目录变更epoch - 首次调用时惰性启动监听，不可用时返回None"""
+    global _tree_watcher
+    if _tree_watcher is None or _tree_watcher.root_path != root_path:
+        if _tree_watcher is not None:
+            _tree_watcher.stop()
+        _tree_watcher = TreeChangeWatcher(root_path)
+        _tree_watcher.start()
+    return _tree_watcher.epoch if _tree_watcher.active else None
+
+
 @dataclass
 class FileChangeTracker:
     """文件变更跟踪器 - Linus原则: 直接数据操作"""
@@ -246,6 +347,12 @@ class IncrementalIndexer:
 
         return stats
 
+    def tree_fingerprint(self, root_path: Optional[str] = None) -> int:
+        """当前目录树指纹 - 只覆盖可索引的扩展名"""
+        return compute_tree_fingerprint(
+            root_path or self.index.base_path, self.builder._language_processors
+        )
+
     def _scan_current_files(self) -> Set[str]:
         """扫描当前文件 - 复用IndexBuilder逻辑"""
         return set(self.builder._scan_files())
@@ -280,26 +387,15 @@ class IncrementalIndexer:
 
     def _remove_file(self, file_path: str) -> None:
         """移除文件索引 - 清理操作"""
-        # 从文件索引中移除
-        self.index.files.pop(file_path, None)
-
-        # 移除相关符号
-        self._remove_file_symbols(file_path)
+        # 文件和相关符号一并移除，经由索引接口保证代数递增、缓存随之失效
+        self.index.remove_file(file_path)
 
         # 移除跟踪
         self.tracker.remove_file_tracking(file_path)
 
     def _remove_file_symbols(self, file_path: str) -> None:
         """移除文件相关符号 - Linus原则: 直接数据操作"""
-        # 找到所有属于该文件的符号并移除
-        symbols_to_remove = [
-            symbol_name
-            for symbol_name, symbol_info in self.index.symbols.items()
-            if symbol_info.file == file_path
-        ]
-
-        for symbol_name in symbols_to_remove:
-            self.index.symbols.pop(symbol_name, None)
+        self.index.remove_file_symbols(file_path)
 
     def force_update_file(self, file_path: str) -> bool:
         """强制更新指定文件 - 忽略变更检测"""
@@ -67,12 +67,48 @@ class BatchEdit:
     snapshot_paths: List[str] = field(default_factory=list)  # 快照文件路径
 
 
+# 导入反向索引: (文件列表, {导入名: [文件序号]})
+ImportsIndex = Tuple[List[str], Dict[str, List[int]]]
+# 排序符号键: (排序后的键, 对应的原始序号)
+SortedKeys = Tuple[List[str], List[int]]
+# (符号表顺序的键列表, 换行拼接的整段文本)；键含换行时文本为None
+KeyText = Tuple[List[str], Optional[str]]
+
+
 @dataclass
 class CodeIndex:
     base_path: str
     files: Dict[str, FileInfo]
     symbols: Dict[str, SymbolInfo]
     scip_manager: Optional["SCIPSymbolManager"] = None  # SCIP协议支持
+    # 反向索引: 文件 -> {符号名: 符号信息}，由add_symbol维护
+    symbols_by_file: Dict[str, Dict[str, SymbolInfo]] = field(
+        default_factory=dict, repr=False
+    )
+    # 搜索引擎只持有索引引用，按索引复用避免每次查询重建分派表
+    _search_engine: Optional[Any] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # 符号名集合版本号: 新增/移除符号名时递增，驱动小写名缓存失效
+    _symbol_keys_version: int = field(default=0, init=False, repr=False, compare=False)
+    _lower_symbol_names: Tuple[Tuple[int, int, int], List[Tuple[str, str]]] = field(
+        default=((0, -1, -1), []), init=False, repr=False, compare=False
+    )
+    # 排序符号键缓存: 是否小写 -> (来源名单, (排序键, 序号))，名单重建即失效
+    _sorted_symbol_keys: Dict[bool, Tuple[List[Tuple[str, str]], SortedKeys]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    # 拼接符号键缓存: 是否小写 -> (来源名单, (键列表, 拼接文本))，名单重建即失效
+    _symbol_key_text: Dict[bool, Tuple[List[Tuple[str, str]], KeyText]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    # 文件表版本号: add_file/remove_file时递增，驱动导入反向索引失效
+    _files_version: int = field(default=0, init=False, repr=False, compare=False)
+    _imports_index: Tuple[Tuple[int, int, int], ImportsIndex] = field(
+        default=((0, -1, -1), ([], {})), init=False, repr=False, compare=False
+    )
+    # 索引代数: 任何文件/符号变更都递增，查询结果缓存据此整体失效
+    _generation: int = field(default=0, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         """初始化SCIP管理器 - Linus风格：简单直接"""
@@ -83,18 +119,97 @@ class CodeIndex:
             integrate_with_code_index(self, self.scip_manager)
 
     def search(self, query: SearchQuery) -> SearchResult:
-        from .search_optimized import OptimizedSearchEngine
+        engine = self._search_engine
+        if engine is None:
+            from .search_optimized import OptimizedSearchEngine
 
-        return OptimizedSearchEngine(self).search(query)
+            engine = self._search_engine = OptimizedSearchEngine(self)
+        return engine.search(query)
 
     def find_symbol(self, name: str) -> List[Dict[str, Any]]:
         return self.search(SearchQuery(pattern=name, type="symbol")).matches
 
     def add_file(self, file_path: str, file_info: FileInfo):
         self.files[file_path] = file_info
+        self._files_version += 1
+        self._generation += 1
 
     def add_symbol(self, symbol_name: str, symbol_info: SymbolInfo):
+        self._generation += 1
+        previous = self.symbols.get(symbol_name)
+        if previous is None:
+            self._symbol_keys_version += 1
+        elif previous.file != symbol_info.file:
+            self.symbols_by_file.get(previous.file, {}).pop(symbol_name, None)
         self.symbols[symbol_name] = symbol_info
+        self.symbols_by_file.setdefault(symbol_info.file, {})[symbol_name] = symbol_info
+
+    def get_file_symbols(self, file_path: str) -> Dict[str, SymbolInfo]:
+        """文件内的符号 - O(1)反向索引查找"""
+        return self.symbols_by_file.get(file_path, {})
+
+    def remove_file_symbols(self, file_path: str) -> None:
+        """移除文件相关符号 - 只触及该文件的符号"""
+        removed = self.symbols_by_file.pop(file_path, None)
+        if removed:
+            self._symbol_keys_version += 1
+            self._generation += 1
+            for symbol_name in removed:
+                self.symbols.pop(symbol_name, None)
+
+    def lowercase_symbol_names(self) -> List[Tuple[str, str]]:
+        """预先小写化的符号名 [(原名, 小写名)] - 符号名增删时重建，查询不再逐个lower()"""
+        key = (id(self.symbols), self._symbol_keys_version, len(self.symbols))
+        cached_key, names = self._lower_symbol_names
+        if cached_key != key:
+            names = [(name, name.lower()) for name in self.symbols]
+            self._lower_symbol_names = (key, names)
+        return names
+
+    def sorted_symbol_keys(self, lower: bool = False) -> SortedKeys:
+        """排序后的符号键及其在lowercase_symbol_names()中的序号 - 前缀查询用bisect定位"""
+        names = self.lowercase_symbol_names()
+        cached = self._sorted_symbol_keys.get(lower)
+        if cached is not None and cached[0] is names:
+            return cached[1]
+        column = 1 if lower else 0
+        order = sorted(range(len(names)), key=lambda position: names[position][column])
+        keys = [names[position][column] for position in order]
+        self._sorted_symbol_keys[lower] = (names, (keys, order))
+        return keys, order
+
+    def symbol_key_text(self, lower: bool = False) -> KeyText:
+        """符号键按符号表顺序换行拼接 - 子串查询整段str.find，命中才进解释器"""
+        names = self.lowercase_symbol_names()
+        cached = self._symbol_key_text.get(lower)
+        if cached is not None and cached[0] is names:
+            return cached[1]
+        column = 1 if lower else 0
+        keys = [entry[column] for entry in names]
+        text: Optional[str] = "\n".join(keys)
+        if text.count("\n") != max(len(keys) - 1, 0):
+            text = None  # 键内含换行，行号与序号对不上
+        self._symbol_key_text[lower] = (names, (keys, text))
+        return keys, text
+
+    def file_imports_index(self) -> ImportsIndex:
+        """导入反向索引 (文件列表, {导入名: [文件序号]}) - 文件表变化时重建
+
+        序号按files的迭代顺序递增，调用方合并后排序即可得到原有顺序。
+        """
+        key = (id(self.files), self._files_version, len(self.files))
+        cached_key, cached = self._imports_index
+        if cached_key == key:
+            return cached
+        paths = list(self.files)
+        importers: Dict[str, List[int]] = {}
+        for position, file_info in enumerate(self.files.values()):
+            for imported in file_info.imports:
+                positions = importers.setdefault(imported, [])
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+        self._imports_index = (key, (paths, importers))
+        return paths, importers
 
     def get_file(self, file_path: str) -> Optional[FileInfo]:
         return self.files.get(file_path)
@@ -134,15 +249,10 @@ class CodeIndex:
 
     def remove_file(self, file_path: str) -> None:
         """移除文件索引 - 统一接口"""
-        self.files.pop(file_path, None)
-        # 移除相关符号
-        symbols_to_remove = [
-            symbol_name
-            for symbol_name, symbol_info in self.symbols.items()
-            if symbol_info.file == file_path
-        ]
-        for symbol_name in symbols_to_remove:
-            self.symbols.pop(symbol_name, None)
+        if self.files.pop(file_path, None) is not None:
+            self._files_version += 1
+            self._generation += 1
+        self.remove_file_symbols(file_path)
 
     # ===== 统一编辑接口 - Good Taste: 消除特殊情况 =====
 
@@ -408,6 +518,7 @@ class CodeIndex:
         try:
             result = subprocess.run(
                 cmd,
+                stdin=subprocess.DEVNULL,
                 capture_output=True,
                 text=True,
                 encoding="utf-8",
@@ -424,8 +535,11 @@ class CodeIndex:
         self, file_path: str, import_statement: str
     ) -> bool:
         """使用ripgrep检查导入是否已存在 - 更精确的检测"""
+        from .search import rg_executable
+
         # 检查ripgrep可用性，fallback到简单检测
-        if not shutil.which("rg"):
+        rg = rg_executable()
+        if not rg:
             # Fallback到原始方法
             try:
                 content = Path(file_path).read_text(encoding="utf-8")
@@ -438,7 +552,7 @@ class CodeIndex:
         escaped_statement = re.escape(import_statement.strip())
         pattern = f"^\\s*{escaped_statement}\\s*$"
 
-        cmd = ["rg", "--line-regexp", "--regexp", pattern, file_path]
+        cmd = [rg, "--line-regexp", "--regexp", pattern, file_path]
 
         output = self._run_ripgrep_command(cmd)
         if output:
@@ -6,13 +6,28 @@ MCP Tools - Linus式统一工具实现
 """
 
 import errno
+import io
+import operator
+import os
 import re
 import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from .builder import handle_mcp_errors
-from .index import SearchQuery, get_index
+try:
+    import orjson
+
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+
+    _ORJSON_AVAILABLE = False
+
+from .builder import detect_language, handle_mcp_errors
+from .index import CodeIndex, SearchQuery, get_index
 from .index import set_project_path as core_set_project_path
 
 # 向后兼容 - 导出execute_tool
@@ -21,41 +36,161 @@ from .tool_registry import execute_tool
 __all__ = ["execute_tool"]
 
 
+def _os_error_message(error: OSError) -> Optional[str]:
+    """通用OSError按errno区分 - 其余errno交给默认消息"""
+    if error.errno == errno.ENOENT:
+        return f"Directory does not exist: {error.filename}"
+    if error.errno == errno.EACCES:
+        return f"Access denied: {error.filename}"
+    return None
+
+
+# 异常类型 -> 错误消息，沿MRO查找，等价于按具体程度排列的isinstance链
+_ERROR_MESSAGES: Dict[type, Callable[[Any], Optional[str]]] = {
+    FileNotFoundError: lambda e: f"File not found: {e.filename}",
+    PermissionError: lambda e: f"Permission denied: {e.filename}",
+    OSError: _os_error_message,
+    UnicodeDecodeError: lambda e: f"File encoding error: cannot decode {e.object!r}",
+    ValueError: lambda e: f"Invalid value: {str(e)}",
+}
+
+
 def _create_error_response(error: Exception, context: str = "") -> Dict[str, Any]:
     """创建具体化的错误响应 - Linus风格：直接说明问题"""
-    if isinstance(error, FileNotFoundError):
-        return {"success": False, "error": f"File not found: {error.filename}"}
-    elif isinstance(error, PermissionError):
-        return {"success": False, "error": f"Permission denied: {error.filename}"}
-    elif isinstance(error, OSError) and error.errno == errno.ENOENT:
-        return {
-            "success": False,
-            "error": f"Directory does not exist: {error.filename}",
-        }
-    elif isinstance(error, OSError) and error.errno == errno.EACCES:
-        return {"success": False, "error": f"Access denied: {error.filename}"}
-    elif isinstance(error, UnicodeDecodeError):
-        return {
-            "success": False,
-            "error": f"File encoding error: cannot decode {error.object!r}",
-        }
-    elif isinstance(error, ValueError):
-        return {"success": False, "error": f"Invalid value: {str(error)}"}
-    else:
-        error_msg = f"{context}: {str(error)}" if context else str(error)
-        return {"success": False, "error": error_msg}
+    for cls in type(error).__mro__:
+        describe = _ERROR_MESSAGES.get(cls)
+        if describe is not None:
+            message = describe(error)
+            if message is not None:
+                return {"success": False, "error": message}
+
+    error_msg = f"{context}: {str(error)}" if context else str(error)
+    return {"success": False, "error": error_msg}
+
+
+# base_path -> Path缓存，项目路径基本固定，避免每次调用重复构造
+_BASE_CACHE: Dict[str, Path] = {}
 
 
 def _resolve_file_path(base_path: Optional[str], file_path: str) -> Path:
     """统一路径解析 - Linus风格：消除重复的Path处理逻辑"""
-    if not base_path:
+    # 绝对路径直接返回，os.path.isabs避免多余的Path构造
+    if not base_path or os.path.isabs(file_path):
         return Path(file_path)
 
-    base = Path(base_path)
-    file_p = Path(file_path)
-
-    # 绝对路径直接返回，相对路径相对于base_path
-    return file_p if file_p.is_absolute() else base / file_path
+    # 相对路径相对于缓存的base_path
+    base = _BASE_CACHE.get(base_path)
+    if base is None:
+        base = _BASE_CACHE.setdefault(base_path, Path(base_path))
+    return base / file_path
+
+
+# 文件内容LRU缓存: path -> (mtime_ns, size, raw, lines)，命中时只需一次stat
+# 每项同时持有原始字节和行列表(约3倍文件大小)，按条目数和总字节数双重限制
+_FILE_CACHE_MAX = 256
+_FILE_CACHE_MAX_BYTES = 64 << 20
+_FILE_CACHE_MAX_FILE_BYTES = 8 << 20  # 超大文件(生成代码、打包产物)不驻留
+_file_cache: "OrderedDict[str, Tuple[int, int, bytes, List[str]]]" = OrderedDict()
+_file_cache_bytes = 0
+
+
+def _fresh_cache_entry(key: str, st: os.stat_result) -> Optional[Tuple]:
+    """返回未过期的缓存项 - 命中时刷新LRU顺序"""
+    entry = _file_cache.get(key)
+    if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+        _file_cache.move_to_end(key)
+        return entry
+    return None
+
+
+def _read_file_cached(
+    full_path: Path, st: Optional[os.stat_result] = None
+) -> Tuple[bytes, List[str]]:
+    """读取文件原始字节和行列表 - mtime或大小变化时重新读取，st可复用调用方的stat"""
+    key = str(full_path)
+    if st is None:
+        st = os.stat(key)
+    entry = _fresh_cache_entry(key, st)
+    if entry is not None:
+        return entry[2], entry[3]
+
+    raw = full_path.read_bytes()
+    # 与read_text的通用换行一致: CRLF和单独的CR都视为行结束
+    # 先用memchr级的成员检查，纯LF文件省去整串replace扫描
+    text = raw.decode("utf-8", errors="ignore")
+    if b"\r" in raw:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+    _invalidate_file_cache(full_path)
+    if len(raw) <= _FILE_CACHE_MAX_FILE_BYTES:
+        _store_file_cache(key, (st.st_mtime_ns, st.st_size, raw, lines))
+    return raw, lines
+
+
+def _store_file_cache(key: str, entry: Tuple[int, int, bytes, List[str]]) -> None:
+    """写入缓存并按LRU淘汰到条目数和字节预算以内"""
+    global _file_cache_bytes
+    _file_cache[key] = entry
+    _file_cache_bytes += len(entry[2])
+    while _file_cache and (
+        len(_file_cache) > _FILE_CACHE_MAX or _file_cache_bytes > _FILE_CACHE_MAX_BYTES
+    ):
+        _file_cache_bytes -= len(_file_cache.popitem(last=False)[1][2])
+
+
+def _read_line_window(
+    full_path: Path, start_idx: int, end_idx: Optional[int]
+) -> Tuple[List[str], int]:
+    """读取行窗口 - 可缓存的文件走行缓存切片，超大文件流式读取只保留窗口内的行
+
+    返回 (窗口行, 总行数)，语义与 split("\\n") 后切片一致
+    """
+    st = os.stat(full_path)
+    # 负数结束位置相对文件末尾，需要完整行列表
+    from_end = end_idx is not None and end_idx < 0
+    if from_end or st.st_size <= _FILE_CACHE_MAX_FILE_BYTES:
+        lines = _read_file_cached(full_path, st)[1]
+        return lines[start_idx:end_idx], len(lines)
+
+    window: List[str] = []
+    total = 1
+    # 文本模式按通用换行切行，与整文件读取的归一化一致
+    with open(full_path, encoding="utf-8", errors="ignore", buffering=1 << 16) as f:
+        for line_idx, line in enumerate(islice(f, end_idx)):
+            if line.endswith("\n"):
+                total += 1
+                line = line[:-1]
+            if line_idx >= start_idx:
+                window.append(line)
+        # 窗口之后只数换行，沿用同一句柄
+        for chunk in iter(lambda: f.read(1 << 16), ""):
+            total += chunk.count("\n")
+
+    # 以换行结尾的文件在split语义下还有一个末尾空行
+    stop = total if end_idx is None else min(total, end_idx)
+    if len(window) < stop - start_idx:
+        window.append("")
+    return window, total
+
+
+def _invalidate_file_cache(full_path: Optional[Path] = None) -> None:
+    """文件被修改后失效缓存 - 不指定路径时全部清空"""
+    global _file_cache_bytes
+    if full_path is None:
+        _file_cache.clear()
+        _file_cache_bytes = 0
+        return
+
+    entry = _file_cache.pop(str(full_path), None)
+    if entry is not None:
+        _file_cache_bytes -= len(entry[2])
+
+
+def _dumps_json(data: Any) -> str:
+    """序列化为JSON文本 - 优先使用orjson，不可用时回退标准库"""
+    if _ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False)
 
 
 # ----- 核心工具 - 直接数据操作 -----
@@ -73,22 +208,16 @@ def tool_set_project_path(path: str) -> Dict[str, Any]:
     }
 
 
-@handle_mcp_errors
-def tool_search_code(
+def _do_search(
     pattern: str,
-    search_type: str = "text",
+    search_type: str,
     file_pattern: Optional[str] = None,
     case_sensitive: bool = True,
 ) -> Dict[str, Any]:
-    """统一搜索 - 消除特殊情况"""
-    index = get_index()
-    query = SearchQuery(
-        pattern=pattern,
-        type=search_type,
-        file_pattern=file_pattern,
-        case_sensitive=case_sensitive,
+    """搜索核心 - 构建一次SearchQuery并直接分派"""
+    result = get_index().search(
+        SearchQuery(pattern, search_type, file_pattern, case_sensitive)
     )
-    result = index.search(query)
     return {
         "success": True,
         "matches": result.matches,
@@ -98,6 +227,17 @@ def tool_search_code(
     }
 
 
+@handle_mcp_errors
+def tool_search_code(
+    pattern: str,
+    search_type: str = "text",
+    file_pattern: Optional[str] = None,
+    case_sensitive: bool = True,
+) -> Dict[str, Any]:
+    """统一搜索 - 消除特殊情况"""
+    return _do_search(pattern, search_type, file_pattern, case_sensitive)
+
+
 @handle_mcp_errors
 def tool_find_files(pattern: str) -> Dict[str, Any]:
     """文件查找 - 直接操作"""
@@ -136,34 +276,49 @@ def tool_get_index_stats() -> Dict[str, Any]:
 # ----- 语义搜索 - 数据驱动 -----
 
 
+@handle_mcp_errors
 def tool_semantic_search(query: str, search_type: str) -> Dict[str, Any]:
     """统一语义搜索 - 替代所有专门函数"""
-    return cast(Dict[str, Any], tool_search_code(query, search_type))
+    return _do_search(query, search_type)
 
 
+@handle_mcp_errors
 def tool_find_references(symbol_name: str) -> Dict[str, Any]:
-    """查找引用 - 委托给统一接口"""
-    return tool_semantic_search(symbol_name, "references")
+    """查找引用 - 直接分派"""
+    return _do_search(symbol_name, "references")
 
 
+@handle_mcp_errors
 def tool_find_definition(symbol_name: str) -> Dict[str, Any]:
-    """查找定义 - 委托给统一接口"""
-    return tool_semantic_search(symbol_name, "definition")
+    """查找定义 - 直接分派"""
+    return _do_search(symbol_name, "definition")
 
 
+@handle_mcp_errors
 def tool_find_callers(function_name: str) -> Dict[str, Any]:
-    """查找调用者 - 委托给统一接口"""
-    return tool_semantic_search(function_name, "callers")
+    """查找调用者 - 直接分派"""
+    return _do_search(function_name, "callers")
 
 
+@handle_mcp_errors
 def tool_find_implementations(interface_name: str) -> Dict[str, Any]:
-    """查找实现 - 委托给统一接口"""
-    return tool_semantic_search(interface_name, "implementations")
+    """查找实现 - 直接分派"""
+    return _do_search(interface_name, "implementations")
 
 
+@handle_mcp_errors
 def tool_find_hierarchy(symbol_name: str) -> Dict[str, Any]:
-    """查找层次结构 - 委托给统一接口"""
-    return tool_semantic_search(symbol_name, "hierarchy")
+    """查找层次结构 - 直接分派"""
+    return _do_search(symbol_name, "hierarchy")
+
+
+@lru_cache(maxsize=512)
+def _organize_imports_impl(imports: Tuple[str, ...]) -> Tuple[str, ...]:
+    """导入去重排序 - 按导入元组缓存，已有序且唯一时直接返回"""
+    # 相邻元素严格递增即有序且无重复 - 一次C层比较遍历，无需建集合和排序
+    if all(map(operator.lt, imports, imports[1:])):
+        return imports
+    return tuple(sorted(set(imports)))
 
 
 @handle_mcp_errors
@@ -174,8 +329,8 @@ def tool_organize_imports(file_path: str) -> Dict[str, Any]:
     if not file_info:
         return {"success": False, "error": f"File not found: {file_path}"}
 
-    # 简单的导入整理逻辑
-    organized_imports = sorted(set(file_info.imports))
+    # 简单的导入整理逻辑 - 重复调用只是一次缓存查找
+    organized_imports = list(_organize_imports_impl(tuple(file_info.imports)))
     return {
         "success": True,
         "original_count": len(file_info.imports),
@@ -187,6 +342,36 @@ def tool_organize_imports(file_path: str) -> Dict[str, Any]:
 # ----- 系统操作 - 最简实现 -----
 
 
+# 上次增量更新时的目录树指纹 (base_path, fingerprint) 与监听epoch (base_path, epoch)
+_last_tree_fingerprint: Optional[Tuple[str, int]] = None
+_last_watch_epoch: Optional[Tuple[str, int]] = None
+_NOOP_UPDATE_STATS = {"updated": 0, "added": 0, "removed": 0}
+
+
+def _update_if_tree_changed(index: CodeIndex) -> Optional[Dict[str, int]]:
+    """目录树未变时跳过增量更新 - 返回None表示无变更
+
+    有目录监听时epoch不变即可直接返回，无需stat遍历；否则比较目录树指纹
+    """
+    global _last_tree_fingerprint, _last_watch_epoch
+    from .incremental import get_incremental_indexer, get_tree_change_epoch
+
+    base_path = index.base_path
+    # 先读epoch再遍历：遍历期间到达的事件会让下次刷新重新检查
+    epoch = get_tree_change_epoch(base_path)
+    if epoch is not None and (base_path, epoch) == _last_watch_epoch:
+        return None
+
+    stats: Optional[Dict[str, int]] = None
+    fingerprint = get_incremental_indexer().tree_fingerprint(base_path)
+    if (base_path, fingerprint) != _last_tree_fingerprint:
+        stats = index.update_incrementally()
+        _last_tree_fingerprint = (base_path, fingerprint)
+
+    _last_watch_epoch = (base_path, epoch) if epoch is not None else None
+    return stats
+
+
 @handle_mcp_errors
 def tool_refresh_index() -> Dict[str, Any]:
     """刷新索引 - 优先使用增量更新"""
@@ -196,29 +381,32 @@ def tool_refresh_index() -> Dict[str, Any]:
 
     # Linus原则: 优先使用增量更新，减少无意义的重建
     start_time = time.time()
-    stats = index.update_incrementally()
+    stats = _update_if_tree_changed(index)
     elapsed = time.time() - start_time
+    if stats is not None:
+        # 无变更时文件缓存(命中即校验mtime/大小)和SCIP查询缓存都仍然有效
+        _invalidate_file_cache()
+        _bump_scip_epoch()
 
     return {
         "success": True,
         "files_indexed": len(index.files),
         "symbols_indexed": len(index.symbols),
-        "update_stats": stats,
+        "update_stats": stats if stats is not None else dict(_NOOP_UPDATE_STATS),
         "update_time": elapsed,
-        "method": "incremental",
+        "method": "incremental" if stats is not None else "noop",
     }
 
 
 @handle_mcp_errors
-def tool_check_file_exists(file_path: str) -> Dict[str, Any]:
-    """文件存在检查 - 直接系统调用"""
+def tool_check_file_exists(file_path: str, check_fs: bool = True) -> Dict[str, Any]:
+    """文件存在检查 - 直接系统调用，check_fs=False时只查索引不stat"""
     index = get_index()
-    full_path = Path(index.base_path) / file_path
-    exists = full_path.exists()
+    full_path = str(_resolve_file_path(index.base_path, file_path))
     return {
         "success": True,
-        "exists": exists,
-        "full_path": str(full_path),
+        "exists": os.path.exists(full_path) if check_fs else None,
+        "full_path": full_path,
         "in_index": file_path in index.files,
     }
 
@@ -242,17 +430,16 @@ def tool_get_file_content(
         return {"success": False, "error": f"File not found: {file_path}"}
 
     try:
-        # 复用SearchEngine的文件读取逻辑
-        lines = full_path.read_text(encoding="utf-8", errors="ignore").split("\n")
-
-        # 处理片段请求 - 消除特殊情况
+        # 处理片段请求 - 只读取需要的窗口，不构造整个文件的行列表
         if start_line is not None:
-            start_idx = max(0, start_line - 1)
-            end_idx = len(lines) if end_line is None else min(len(lines), end_line)
-            content_lines = lines[start_idx:end_idx]
+            content_lines, total_lines = _read_line_window(
+                full_path, max(0, start_line - 1), end_line
+            )
             actual_start = start_line
         else:
-            content_lines = lines
+            # 缓存的行列表是共享的，返回副本
+            content_lines = _read_file_cached(full_path)[1][:]
+            total_lines = len(content_lines)
             actual_start = 1
 
         # 获取文件元信息（如果已索引）
@@ -264,11 +451,11 @@ def tool_get_file_content(
             "success": True,
             "file_path": file_path,
             "content": content_lines,
-            "total_lines": len(lines),
+            "total_lines": total_lines,
             "language": language,
             "encoding": "utf-8",
             "start_line": actual_start,
-            "end_line": end_line or len(lines),
+            "end_line": end_line or total_lines,
         }
 
         # 只在需要时添加line_numbers - 消除冗余数据
@@ -278,7 +465,7 @@ def tool_get_file_content(
                     range(start_line, start_line + len(content_lines))
                 )
             else:
-                result["line_numbers"] = list(range(1, len(lines) + 1))
+                result["line_numbers"] = list(range(1, total_lines + 1))
 
         return result
     except Exception as e:
@@ -288,25 +475,70 @@ def tool_get_file_content(
 # ----- 符号语法体提取工具 - Linus式启发式算法 -----
 
 
-def _detect_syntax_body_end(lines: List[str], start_line: int, language: str) -> int:
-    """
-    检测语法体结束行 - Linus式启发式算法
-
-    统一算法处理不同语言，消除特殊情况
-    """
-    if start_line >= len(lines):
-        return start_line
-
-    start_idx = start_line - 1  # 转换为0索引
-
-    # 语言特定的检测策略
-    if language in ["python"]:
-        return _detect_python_body_end(lines, start_idx)
-    elif language in ["javascript", "typescript", "java", "c", "cpp", "rust", "go"]:
-        return _detect_brace_body_end(lines, start_idx)
-    else:
-        # 默认启发式：基于缩进的通用算法
-        return _detect_indent_body_end(lines, start_idx)
+# 符号定义前缀模式 - 模块加载时编译一次，捕获组为符号名
+# 与符号无关，逐行匹配后用字符串相等比较符号名；各语言标识符均大小写敏感
+_PYTHON_DEF_RES = (
+    re.compile(r"^(?:async\s+)?def\s+(\w+)\s*\("),
+    re.compile(r"^class\s+(\w+)\s*:"),
+    re.compile(r"^(\w+)\s*="),
+)
+_JS_DEF_RES = (
+    re.compile(r"^function\s+(\w+)\s*\("),
+    re.compile(r"^(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?\("),
+    re.compile(r"^class\s+(\w+)"),
+)
+_JAVA_DEF_RES = (
+    re.compile(r"^(?:(?:public|private|protected|static)\b)?\s*(?:\w+\s+)*(\w+)\s*\("),
+    re.compile(r"^(?:public\s+)?(?:abstract\s+)?class\s+(\w+)"),
+    re.compile(r"^(?:public\s+)?(?:interface|enum)\s+(\w+)"),
+)
+_C_DEF_RES = (
+    re.compile(r"^(?:extern\s+)?(?:static\s+)?(?:inline\s+)?\w+\s+(\w+)\s*\("),
+    re.compile(r"^(?:struct|union|enum)\s+(\w+)"),
+    re.compile(r"^#define\s+(\w+)"),
+)
+_RUST_DEF_RES = (
+    re.compile(r"^(?:pub\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+(\w+)\s*\("),
+    re.compile(r"^(?:struct|enum|trait)\s+(\w+)"),
+    re.compile(r"^impl\s+.*\s+for\s+(\w+)"),
+)
+_GO_DEF_RES = (
+    re.compile(r"^func\s+(\w+)\s*\("),
+    re.compile(r"^type\s+(\w+)\s+(?:struct|interface)\b"),
+    re.compile(r"^(?:var|const)\s+(\w+)\s+"),
+)
+
+_DEFINITION_PREFIX_RES: Dict[str, Tuple[re.Pattern, ...]] = {
+    "python": _PYTHON_DEF_RES,
+    "py": _PYTHON_DEF_RES,
+    "javascript": _JS_DEF_RES,
+    "js": _JS_DEF_RES,
+    "typescript": _JS_DEF_RES,
+    "ts": _JS_DEF_RES,
+    "java": _JAVA_DEF_RES,
+    "c": _C_DEF_RES,
+    "cpp": _C_DEF_RES,
+    "c++": _C_DEF_RES,
+    "cc": _C_DEF_RES,
+    "rust": _RUST_DEF_RES,
+    "rs": _RUST_DEF_RES,
+    "go": _GO_DEF_RES,
+}
+
+
+def _is_definition_line(
+    line_content: str, symbol_name: str, prefix_res: Optional[Tuple[re.Pattern, ...]]
+) -> bool:
+    """判断单行是否为符号定义 - 无语言模式时退化为子串匹配"""
+    if prefix_res is None:
+        # 通用模式：包含符号名的任何行
+        return symbol_name.lower() in line_content.lower()
+
+    for prefix_re in prefix_res:
+        match = prefix_re.match(line_content)
+        if match and match.group(1) == symbol_name:
+            return True
+    return False
 
 
 def _find_symbol_definition_line(
@@ -320,71 +552,24 @@ def _find_symbol_definition_line(
     if not lines or start_line < 1 or start_line > len(lines):
         return start_line
 
+    prefix_res = _DEFINITION_PREFIX_RES.get(language)
+
+    # 快速路径：索引行号准确时直接返回，无需扫描附近行
+    probe = lines[start_line - 1]
+    if symbol_name in probe and _is_definition_line(
+        probe.strip(), symbol_name, prefix_res
+    ):
+        return start_line
+
     # 搜索范围：起始行前后各10行
     search_start = max(1, start_line - 10)
     search_end = min(len(lines), start_line + 10)
 
-    # 构建符号匹配模式
-    if language in ["python", "py"]:
-        patterns = [
-            rf"^(async\s+)?def\s+{re.escape(symbol_name)}\s*\(",
-            rf"^class\s+{re.escape(symbol_name)}\s*:",
-            rf"^{re.escape(symbol_name)}\s*=",
-        ]
-    elif language in ["javascript", "js", "typescript", "ts"]:
-        patterns = [
-            rf"^function\s+{re.escape(symbol_name)}\s*\(",
-            rf"^const\s+{re.escape(symbol_name)}\s*=\s*(async\s+)?\(",
-            rf"^let\s+{re.escape(symbol_name)}\s*=\s*(async\s+)?\(",
-            rf"^var\s+{re.escape(symbol_name)}\s*=\s*(async\s+)?\(",
-            rf"^class\s+{re.escape(symbol_name)}\b",
-        ]
-    elif language in ["java"]:
-        patterns = [
-            rf"^(public|private|protected|static)?\s*(\w+\s+)*{re.escape(symbol_name)}\s*\(",
-            rf"^(public\s+)?(abstract\s+)?class\s+{re.escape(symbol_name)}\b",
-            rf"^(public\s+)?interface\s+{re.escape(symbol_name)}\b",
-            rf"^(public\s+)?enum\s+{re.escape(symbol_name)}\b",
-        ]
-    elif language in ["c", "cpp", "c++", "cc"]:
-        patterns = [
-            rf"^(extern\s+)?(static\s+)?(inline\s+)?\w+\s+{re.escape(symbol_name)}\s*\(",
-            rf"^struct\s+{re.escape(symbol_name)}\b",
-            rf"^union\s+{re.escape(symbol_name)}\b",
-            rf"^enum\s+{re.escape(symbol_name)}\b",
-            rf"^#define\s+{re.escape(symbol_name)}\b",
-        ]
-    elif language in ["rust", "rs"]:
-        patterns = [
-            rf"^(pub\s+)?(async\s+)?(unsafe\s+)?fn\s+{re.escape(symbol_name)}\s*\(",
-            rf"^struct\s+{re.escape(symbol_name)}\b",
-            rf"^enum\s+{re.escape(symbol_name)}\b",
-            rf"^trait\s+{re.escape(symbol_name)}\b",
-            rf"^impl\s+.*\s+for\s+{re.escape(symbol_name)}\b",
-        ]
-    elif language in ["go"]:
-        patterns = [
-            rf"^func\s+{re.escape(symbol_name)}\s*\(",
-            rf"^type\s+{re.escape(symbol_name)}\s+struct\b",
-            rf"^type\s+{re.escape(symbol_name)}\s+interface\b",
-            rf"^var\s+{re.escape(symbol_name)}\s+",
-            rf"^const\s+{re.escape(symbol_name)}\s+",
-        ]
-    else:
-        # 通用模式
-        patterns = [
-            rf".*{re.escape(symbol_name)}.*",  # 包含符号名的任何行
-        ]
-
     # 在搜索范围内查找匹配的行
     for line_num in range(search_start, search_end + 1):
         line_content = lines[line_num - 1].strip()
-        if not line_content:
-            continue
-
-        for pattern in patterns:
-            if re.search(pattern, line_content, re.IGNORECASE):
-                return line_num
+        if line_content and _is_definition_line(line_content, symbol_name, prefix_res):
+            return line_num
 
     # 如果没找到，返回原始行号
     return start_line
@@ -509,12 +694,12 @@ def _extract_function_signature(line: str, language: str) -> str:
 
 
 def _detect_syntax_body_end_improved(
-    lines: List[str], start_line: int, language: str
+    lines: List[str], start_line: int, language: str, data: Optional[bytes] = None
 ) -> int:
     """
     改进的语法体结束行检测 - 增强边界情况处理
 
-    统一算法处理不同语言，增强错误处理
+    统一算法处理不同语言，增强错误处理；data为文件原始字节，供大括号扫描复用
     """
     if start_line < 1 or start_line > len(lines):
         return start_line
@@ -525,14 +710,40 @@ def _detect_syntax_body_end_improved(
     if start_idx >= len(lines) or not lines[start_idx].strip():
         return start_line
 
-    # 语言特定的检测策略
-    if language in ["python"]:
-        return _detect_python_body_end_improved(lines, start_idx)
-    elif language in ["javascript", "typescript", "java", "c", "cpp", "rust", "go"]:
-        return _detect_brace_body_end_improved(lines, start_idx)
-    else:
-        # 默认启发式：基于缩进的通用算法
-        return _detect_indent_body_end_improved(lines, start_idx)
+    # 语言特定的检测策略 - 默认启发式：基于缩进的通用算法
+    detector = _BODY_END_DISPATCH.get(language, _detect_indent_body_end_improved)
+    if detector is _detect_brace_body_end_improved:
+        return _detect_brace_body_end_improved(lines, start_idx, data)
+    return detector(lines, start_idx)
+
+
+# 缩进概况缓存: id(lines) -> (lines, 缩进列表, 定义起始标记)
+# 持有lines引用保证id不被复用；同一文件的多个符号共享一次预处理
+_INDENT_PROFILE_MAX = 64
+_indent_profiles: "OrderedDict[int, Tuple[List[str], List[int], List[bool]]]" = (
+    OrderedDict()
+)
+_PYTHON_DEF_PREFIXES = ("def ", "class ", "async def ", "@")
+
+
+def _get_indent_profile(lines: List[str]) -> Tuple[List[int], List[bool]]:
+    """每行缩进(空行为-1)和是否以定义关键字开头 - 按行列表缓存"""
+    key = id(lines)
+    entry = _indent_profiles.get(key)
+    if entry is not None and entry[0] is lines and len(entry[1]) == len(lines):
+        _indent_profiles.move_to_end(key)
+        return entry[1], entry[2]
+
+    stripped = [line.strip() for line in lines]
+    indents = [
+        len(line) - len(line.lstrip()) if body else -1
+        for line, body in zip(lines, stripped)
+    ]
+    def_flags = [body.startswith(_PYTHON_DEF_PREFIXES) for body in stripped]
+    _indent_profiles[key] = (lines, indents, def_flags)
+    if len(_indent_profiles) > _INDENT_PROFILE_MAX:
+        _indent_profiles.popitem(last=False)
+    return indents, def_flags
 
 
 def _detect_python_body_end_improved(lines: List[str], start_idx: int) -> int:
@@ -540,194 +751,125 @@ def _detect_python_body_end_improved(lines: List[str], start_idx: int) -> int:
     if start_idx >= len(lines):
         return start_idx + 1
 
-    start_line = lines[start_idx].rstrip()
-    if not start_line:
+    indents, def_flags = _get_indent_profile(lines)
+    start_indent = indents[start_idx]
+    if start_indent < 0:
         return start_idx + 1
 
-    # 计算起始缩进
-    start_indent = len(start_line) - len(start_line.lstrip())
-
-    # 处理装饰器情况 - 如果有装饰器，使用第一个非装饰器行的缩进
-    line_idx = start_idx
-    while line_idx > 0 and lines[line_idx - 1].strip().startswith("@"):
-        line_idx -= 1
-
-    # 查找第一个小于等于起始缩进的非空行
+    # 对于Python，只有当缩进严格小于起始缩进时才结束
+    # 或者遇到同级别的def/class/async def/装饰器
     for i in range(start_idx + 1, len(lines)):
-        line = lines[i].rstrip()
-        if not line:  # 跳过空行
+        current_indent = indents[i]
+        if current_indent < 0:  # 跳过空行
             continue
-
-        current_indent = len(line) - len(line.lstrip())
-
-        # 对于Python，只有当缩进严格小于起始缩进时才结束
-        # 或者遇到同级别的def/class/async def等
-        if current_indent < start_indent:
-            return i  # 返回1索引行号
-        elif current_indent == start_indent and any(
-            line.strip().startswith(keyword)
-            for keyword in ["def ", "class ", "async def ", "@"]
+        if current_indent < start_indent or (
+            current_indent == start_indent and def_flags[i]
         ):
-            return i  # 遇到同级别的定义，结束
+            return i  # 返回1索引行号
 
     return len(lines)  # 文件末尾
 
 
-def _detect_brace_body_end_improved(lines: List[str], start_idx: int) -> int:
-    """改进的大括号匹配检测 - 增强边界处理"""
-    if start_idx >= len(lines):
-        return start_idx + 1
-
-    brace_count = 0
-    found_opening = False
-    in_string = False
-    string_char = None
-    in_comment = False
-    in_multiline_comment = False
+# 大括号扫描只关心的字节 - 均为ASCII，直接扫描原始字节无需解码
+# 其余字节(包括换行)由正则引擎在C层跳过，行号在找到结束括号时用count一次算出
+_BRACE_TOKEN_RE = re.compile(rb"[{}\"'/*]")
 
-    # 从起始行开始扫描
-    for i in range(start_idx, len(lines)):
-        line = lines[i]
-
-        for j, char in enumerate(line):
-            # 处理字符串状态
-            if not in_comment and not in_multiline_comment:
-                if char in ['"', "'"] and (j == 0 or line[j - 1] != "\\"):
-                    if not in_string:
-                        in_string = True
-                        string_char = char
-                    elif char == string_char:
-                        in_string = False
-                        string_char = None
-
-            # 处理注释状态（简化版）
-            if not in_string:
-                if char == "/" and j + 1 < len(line):
-                    if line[j + 1] == "/" and not in_multiline_comment:
-                        in_comment = True
-                        break  # 跳过行注释剩余部分
-                    elif line[j + 1] == "*" and not in_comment:
-                        in_multiline_comment = True
-                elif (
-                    char == "*"
-                    and j + 1 < len(line)
-                    and line[j + 1] == "/"
-                    and in_multiline_comment
-                ):
-                    in_multiline_comment = False
-
-            # 只在非字符串、非注释中计算大括号
-            if not in_string and not in_comment and not in_multiline_comment:
-                if char == "{":
-                    brace_count += 1
-                    found_opening = True
-                elif char == "}":
-                    brace_count -= 1
-                    if found_opening and brace_count == 0:
-                        return i + 2  # 返回1索引，包含结束大括号的下一行
 
-    return len(lines)  # 文件末尾
-
-
-def _detect_indent_body_end_improved(lines: List[str], start_idx: int) -> int:
-    """改进的通用缩进检测 - 增强边界处理"""
+def _detect_brace_body_end_improved(
+    lines: List[str], start_idx: int, data: Optional[bytes] = None
+) -> int:
+    """改进的大括号匹配检测 - 增强边界处理，基于字节扫描"""
     if start_idx >= len(lines):
         return start_idx + 1
 
-    start_line = lines[start_idx].rstrip()
-    if not start_line:
-        return start_idx + 1
+    if data is None:
+        data = "\n".join(lines).encode("utf-8")
 
-    # 计算起始缩进
-    start_indent = len(start_line) - len(start_line.lstrip())
+    # 定位起始行的字节偏移
+    pos = 0
+    for _ in range(start_idx):
+        pos = data.find(b"\n", pos) + 1
 
-    # 查找缩进回退的位置
-    for i in range(start_idx + 1, len(lines)):
-        line = lines[i].rstrip()
-        if not line:  # 跳过空行
+    start_pos = pos
+    brace_count = 0
+    found_opening = False
+    in_string = False
+    string_char = b""
+    in_multiline_comment = False
+    search = _BRACE_TOKEN_RE.search
+
+    while True:
+        token = search(data, pos)
+        if token is None:
+            break
+        j = token.start()
+        pos = j + 1
+        char = token.group()
+
+        # 处理字符串状态
+        if not in_multiline_comment and char in (b'"', b"'"):
+            if data[j - 1 : j] != b"\\":
+                if not in_string:
+                    in_string = True
+                    string_char = char
+                elif char == string_char:
+                    in_string = False
+                    string_char = b""
+        if in_string:
             continue
 
-        current_indent = len(line) - len(line.lstrip())
+        # 处理注释状态（简化版）- 行注释直接跳到行尾
+        next_char = data[pos : pos + 1]
+        if char == b"/":
+            if next_char == b"/" and not in_multiline_comment:
+                pos = data.find(b"\n", pos)
+                if pos == -1:
+                    break
+                continue
+            if next_char == b"*":
+                in_multiline_comment = True
+        elif char == b"*" and next_char == b"/" and in_multiline_comment:
+            in_multiline_comment = False
+        if in_multiline_comment:
+            continue
 
-        # 对于通用算法，当缩进小于等于起始缩进时结束
-        if current_indent <= start_indent:
-            return i  # 返回1索引行号
+        # 只在非字符串、非注释中计算大括号
+        if char == b"{":
+            brace_count += 1
+            found_opening = True
+        elif char == b"}":
+            brace_count -= 1
+            if found_opening and brace_count == 0:
+                line_idx = start_idx + data.count(b"\n", start_pos, j)
+                return line_idx + 2  # 返回1索引，包含结束大括号的下一行
 
     return len(lines)  # 文件末尾
 
 
-def _detect_python_body_end(lines: List[str], start_idx: int) -> int:
-    """Python缩进检测 - 最简实现"""
+def _detect_indent_body_end_improved(lines: List[str], start_idx: int) -> int:
+    """改进的通用缩进检测 - 增强边界处理"""
     if start_idx >= len(lines):
         return start_idx + 1
 
-    start_line = lines[start_idx].rstrip()
-    if not start_line:
+    indents = _get_indent_profile(lines)[0]
+    start_indent = indents[start_idx]
+    if start_indent < 0:
         return start_idx + 1
 
-    # 计算起始缩进
-    start_indent = len(start_line) - len(start_line.lstrip())
-
-    # 查找第一个小于等于起始缩进的非空行
+    # 对于通用算法，当缩进小于等于起始缩进时结束（空行为-1，自动跳过）
     for i in range(start_idx + 1, len(lines)):
-        line = lines[i].rstrip()
-        if not line:  # 跳过空行
-            continue
-
-        current_indent = len(line) - len(line.lstrip())
-        if current_indent <= start_indent:
+        if 0 <= indents[i] <= start_indent:
             return i  # 返回1索引行号
 
     return len(lines)  # 文件末尾
 
 
-def _detect_brace_body_end(lines: List[str], start_idx: int) -> int:
-    """大括号匹配检测 - 适用于C系语言"""
-    if start_idx >= len(lines):
-        return start_idx + 1
-
-    brace_count = 0
-    found_opening = False
-
-    # 从起始行开始扫描
-    for i in range(start_idx, len(lines)):
-        line = lines[i]
-
-        for char in line:
-            if char == "{":
-                brace_count += 1
-                found_opening = True
-            elif char == "}":
-                brace_count -= 1
-                if found_opening and brace_count == 0:
-                    return i + 2  # 返回1索引，包含结束大括号的下一行
-
-    return len(lines)  # 文件末尾
-
-
-def _detect_indent_body_end(lines: List[str], start_idx: int) -> int:
-    """通用缩进检测 - 语言无关算法"""
-    if start_idx >= len(lines):
-        return start_idx + 1
-
-    start_line = lines[start_idx].rstrip()
-    if not start_line:
-        return start_idx + 1
-
-    # 计算起始缩进
-    start_indent = len(start_line) - len(start_line.lstrip())
-
-    # 查找缩进回退的位置
-    for i in range(start_idx + 1, len(lines)):
-        line = lines[i].rstrip()
-        if not line:  # 跳过空行
-            continue
-
-        current_indent = len(line) - len(line.lstrip())
-        if current_indent <= start_indent:
-            return i  # 返回1索引行号
-
-    return len(lines)  # 文件末尾
+# 语言 -> 语法体结束检测器，未列出的语言使用缩进算法
+_BRACE_LANGUAGES = ("javascript", "typescript", "java", "c", "cpp", "rust", "go")
+_BODY_END_DISPATCH: Dict[str, Callable[[List[str], int], int]] = {
+    "python": _detect_python_body_end_improved,
+    **{lang: _detect_brace_body_end_improved for lang in _BRACE_LANGUAGES},
+}
 
 
 @handle_mcp_errors
@@ -748,11 +890,11 @@ def tool_get_symbol_body(
     symbol_info = index.symbols.get(symbol_name)
     if not symbol_info:
         # 提供相似符号建议
+        query_lower = symbol_name.lower()
         similar_symbols = [
             name
-            for name in index.symbols.keys()
-            if symbol_name.lower() in name.lower()
-            or name.lower() in symbol_name.lower()
+            for name, name_lower in index.lowercase_symbol_names()
+            if query_lower in name_lower or name_lower in query_lower
         ][:5]  # 最多5个建议
 
         suggestion_msg = ""
@@ -779,7 +921,7 @@ def tool_get_symbol_body(
 
     # 4. 改进的语法体边界检测和内容提取
     try:
-        lines = full_path.read_text(encoding="utf-8", errors="ignore").split("\n")
+        raw, lines = _read_file_cached(full_path)
 
         # 验证行号有效性
         if start_line < 1 or start_line > len(lines):
@@ -794,7 +936,12 @@ def tool_get_symbol_body(
         )
 
         # 6. 改进的语法体边界检测
-        end_line = _detect_syntax_body_end_improved(lines, actual_start_line, language)
+        # 单独的CR也切行时字节里的换行数与行号对不上，改由行列表重新编码
+        if b"\r" in raw and raw.count(b"\n") + 1 != len(lines):
+            raw = None
+        end_line = _detect_syntax_body_end_improved(
+            lines, actual_start_line, language, raw
+        )
 
         # 6. 验证边界有效性
         if end_line <= start_line:
@@ -870,6 +1017,8 @@ def tool_rename_symbol(old_name: str, new_name: str) -> Dict[str, Any]:
     try:
         index = get_index()
         success, error, files_changed = index.rename_symbol_atomic(old_name, new_name)
+        _invalidate_file_cache()
+        _bump_scip_epoch()
 
         return {"success": success, "files_changed": files_changed, "error": error}
     except Exception as e:
@@ -882,6 +1031,8 @@ def tool_add_import(file_path: str, import_statement: str) -> Dict[str, Any]:
     try:
         index = get_index()
         success, error = index.add_import_atomic(file_path, import_statement)
+        _invalidate_file_cache(_resolve_file_path(index.base_path, file_path))
+        _bump_scip_epoch()
 
         return {
             "success": success,
@@ -900,12 +1051,12 @@ def tool_update_incrementally() -> Dict[str, Any]:
         return {"success": False, "error": "No project path set"}
 
     start_time = time.time()
-    stats = index.update_incrementally()
+    stats = _update_if_tree_changed(index)
     elapsed = time.time() - start_time
 
     return {
         "success": True,
-        "update_stats": stats,
+        "update_stats": stats if stats is not None else dict(_NOOP_UPDATE_STATS),
         "update_time": elapsed,
         "files_indexed": len(index.files),
         "symbols_indexed": len(index.symbols),
@@ -920,6 +1071,8 @@ def tool_force_update_file(file_path: str) -> Dict[str, Any]:
         return {"success": False, "error": "No project path set"}
 
     success = index.force_update_file(file_path)
+    _invalidate_file_cache(_resolve_file_path(index.base_path, file_path))
+    _bump_scip_epoch()
     return {
         "success": success,
         "file_path": file_path,
@@ -954,6 +1107,10 @@ def tool_full_rebuild_index() -> Dict[str, Any]:
     start_time = time.time()
     new_index = core_set_project_path(index.base_path)
     elapsed = time.time() - start_time
+    if stats is not None:
+        # 无变更时文件缓存(命中即校验mtime/大小)和SCIP查询缓存都仍然有效
+        _invalidate_file_cache()
+        _bump_scip_epoch()
 
     return {
         "success": True,
@@ -972,6 +1129,8 @@ def tool_apply_edit(
     try:
         index = get_index()
         success, error = index.edit_file_atomic(file_path, old_content, new_content)
+        _invalidate_file_cache(_resolve_file_path(index.base_path, file_path))
+        _bump_scip_epoch()
 
         return {
             "success": success,
@@ -985,6 +1144,44 @@ def tool_apply_edit(
 # ----- SCIP协议工具 - Linus风格统一接口 -----
 
 
+# SCIP只读查询结果缓存: (工具名, 参数) -> (epoch, scip_manager, 结果)
+# SCIP数据或索引可能变化时递增epoch整体失效；管理器换新(项目重建)同样失效
+_SCIP_RESULT_CACHE_MAX = 512
+_scip_result_cache: "OrderedDict[Tuple, Tuple[int, Any, Dict[str, Any]]]" = (
+    OrderedDict()
+)
+_scip_epoch = 0
+
+
+def _bump_scip_epoch() -> None:
+    """索引变更后失效SCIP查询缓存"""
+    global _scip_epoch
+    _scip_epoch += 1
+    _scip_result_cache.clear()
+
+
+def _memoize_scip(func: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    """缓存SCIP只读工具的成功结果 - 同一符号的悬停/跳转/引用查询只投影一次"""
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        manager = get_index().scip_manager
+        entry = _scip_result_cache.get(key)
+        if entry is not None and entry[0] == _scip_epoch and entry[1] is manager:
+            _scip_result_cache.move_to_end(key)
+            return entry[2]
+
+        result = func(*args, **kwargs)
+        if result.get("success"):
+            _scip_result_cache[key] = (_scip_epoch, manager, result)
+            if len(_scip_result_cache) > _SCIP_RESULT_CACHE_MAX:
+                _scip_result_cache.popitem(last=False)
+        return result
+
+    return wrapper
+
+
 @handle_mcp_errors
 def tool_generate_scip_symbol_id(
     symbol_name: str, file_path: str, language: str, symbol_type: str = "unknown"
@@ -1009,13 +1206,15 @@ def tool_generate_scip_symbol_id(
 
 
 @handle_mcp_errors
+@_memoize_scip
 def tool_find_scip_symbol(symbol_name: str) -> Dict[str, Any]:
     """查找SCIP符号 - 支持重载和多定义"""
     index = get_index()
-    if not hasattr(index, "find_scip_symbol"):
+    if not index.scip_manager:
         return {"success": False, "error": "SCIP integration not available"}
 
-    symbols = index.find_scip_symbol(symbol_name)
+    # 直接调用管理器，省去实例绑定包装层的额外调用帧
+    symbols = index.scip_manager.find_symbol_by_name(symbol_name)
 
     return {
         "success": True,
@@ -1039,22 +1238,33 @@ def tool_find_scip_symbol(symbol_name: str) -> Dict[str, Any]:
 
 
 @handle_mcp_errors
-def tool_get_cross_references(symbol_name: str) -> Dict[str, Any]:
-    """获取符号的跨文件引用"""
+@_memoize_scip
+def tool_get_cross_references(
+    symbol_name: str, columnar: bool = False
+) -> Dict[str, Any]:
+    """获取符号的跨文件引用 - columnar时每个文件返回按字段分列的数组"""
     index = get_index()
     if not hasattr(index, "get_cross_references"):
         return {"success": False, "error": "SCIP integration not available"}
 
     cross_refs = index.get_cross_references(symbol_name)
 
-    # 转换为JSON友好格式
-    references_by_file = {}
-    total_references = 0
-
-    for file_path, occurrences in cross_refs.items():
-        file_refs = []
-        for occ in occurrences:
-            file_refs.append(
+    # 转换为JSON友好格式 - 推导式一次构建，总数直接由长度求和
+    if columnar:
+        # 列式布局: 每个文件5个平铺数组，而不是N个5键小字典
+        references_by_file = {
+            file_path: {
+                "symbol_ids": [occ.symbol_id for occ in occurrences],
+                "lines": [occ.line for occ in occurrences],
+                "columns": [occ.column for occ in occurrences],
+                "occurrence_types": [occ.occurrence_type for occ in occurrences],
+                "contexts": [occ.context for occ in occurrences],
+            }
+            for file_path, occurrences in cross_refs.items()
+        }
+    else:
+        references_by_file = {
+            file_path: [
                 {
                     "symbol_id": occ.symbol_id,
                     "line": occ.line,
@@ -1062,9 +1272,11 @@ def tool_get_cross_references(symbol_name: str) -> Dict[str, Any]:
                     "occurrence_type": occ.occurrence_type,
                     "context": occ.context,
                 }
-            )
-        references_by_file[file_path] = file_refs
-        total_references += len(file_refs)
+                for occ in occurrences
+            ]
+            for file_path, occurrences in cross_refs.items()
+        }
+    total_references = sum(map(len, cross_refs.values()))
 
     return {
         "success": True,
@@ -1076,6 +1288,7 @@ def tool_get_cross_references(symbol_name: str) -> Dict[str, Any]:
 
 
 @handle_mcp_errors
+@_memoize_scip
 def tool_get_symbol_graph(symbol_id: str) -> Dict[str, Any]:
     """获取符号关系图 - 完整的依赖和引用信息"""
     index = get_index()
@@ -1087,16 +1300,19 @@ def tool_get_symbol_graph(symbol_id: str) -> Dict[str, Any]:
         return {"success": False, "error": f"Symbol not found: {symbol_id}"}
 
     # 转换为JSON友好格式
+    symbol = graph["symbol"]
+    definitions = graph["definitions"]
+    references = graph["references"]
     result = {
         "success": True,
         "symbol_id": symbol_id,
         "symbol": {
-            "name": graph["symbol"].name,
-            "language": graph["symbol"].language,
-            "file_path": graph["symbol"].file_path,
-            "line": graph["symbol"].line,
-            "symbol_type": graph["symbol"].symbol_type,
-            "signature": graph["symbol"].signature,
+            "name": symbol.name,
+            "language": symbol.language,
+            "file_path": symbol.file_path,
+            "line": symbol.line,
+            "symbol_type": symbol.symbol_type,
+            "signature": symbol.signature,
         },
         "definitions": [
             {
@@ -1105,7 +1321,7 @@ def tool_get_symbol_graph(symbol_id: str) -> Dict[str, Any]:
                 "column": def_occ.column,
                 "occurrence_type": def_occ.occurrence_type,
             }
-            for def_occ in graph["definitions"]
+            for def_occ in definitions
         ],
         "references": [
             {
@@ -1115,32 +1331,48 @@ def tool_get_symbol_graph(symbol_id: str) -> Dict[str, Any]:
                 "occurrence_type": ref_occ.occurrence_type,
                 "context": ref_occ.context,
             }
-            for ref_occ in graph["references"]
+            for ref_occ in references
         ],
         "cross_file_usage": graph["cross_file_usage"],
-        "definition_count": len(graph["definitions"]),
-        "reference_count": len(graph["references"]),
+        "definition_count": len(definitions),
+        "reference_count": len(references),
     }
 
     return result
 
 
 @handle_mcp_errors
-def tool_export_scip_index() -> Dict[str, Any]:
-    """导出SCIP标准格式索引"""
+def tool_export_scip_index(as_json: bool = False) -> Dict[str, Any]:
+    """导出SCIP标准格式索引 - as_json时直接返回序列化文本，避免调用方再次序列化"""
     index = get_index()
     if not hasattr(index, "export_scip"):
         return {"success": False, "error": "SCIP integration not available"}
 
+    if as_json and index.scip_manager is not None:
+        # 流式序列化: 文档逐个编码写入缓冲，不再先构造完整的导出字典
+        buffer = io.BytesIO()
+        summary = index.scip_manager.export_scip_stream(buffer)
+        return {
+            "success": True,
+            **summary,
+            "scip_index_json": buffer.getvalue().decode("utf-8"),
+        }
+
     scip_index = index.export_scip()
+    documents = scip_index.get("documents")
+    external_symbols = scip_index.get("external_symbols")
 
-    return {
+    result: Dict[str, Any] = {
         "success": True,
-        "scip_index": scip_index,
         "metadata": scip_index.get("metadata", {}),
-        "document_count": len(scip_index.get("documents", [])),
-        "external_symbols_count": len(scip_index.get("external_symbols", [])),
+        "document_count": len(documents) if documents else 0,
+        "external_symbols_count": len(external_symbols) if external_symbols else 0,
     }
+    if as_json:
+        result["scip_index_json"] = _dumps_json(scip_index)
+    else:
+        result["scip_index"] = scip_index
+    return result
 
 
 @handle_mcp_errors
@@ -1154,8 +1386,6 @@ def tool_process_file_with_scip(
 
     # 自动检测语言
     if not language:
-        from .builder import detect_language
-
         language = detect_language(file_path)
 
     # 从现有索引获取符号信息
@@ -1164,23 +1394,22 @@ def tool_process_file_with_scip(
         return {"success": False, "error": f"File not indexed: {file_path}"}
 
     # 转换为SCIP格式
-    symbols_data = []
-    for symbol_name, symbol_info in index.symbols.items():
-        if symbol_info.file == file_path:
-            symbols_data.append(
-                {
-                    "name": symbol_name,
-                    "type": symbol_info.type,
-                    "line": symbol_info.line,
-                    "column": 0,  # 默认列
-                    "signature": symbol_info.signature,
-                }
-            )
+    symbols_data = [
+        {
+            "name": symbol_name,
+            "type": symbol_info.type,
+            "line": symbol_info.line,
+            "column": 0,  # 默认列
+            "signature": symbol_info.signature,
+        }
+        for symbol_name, symbol_info in index.get_file_symbols(file_path).items()
+    ]
 
     # 使用SCIP管理器处理
     document = index.scip_manager.process_file_symbols(
         file_path, language, symbols_data
     )
+    _bump_scip_epoch()
 
     return {
         "success": True,
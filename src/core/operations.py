@@ -5,9 +5,10 @@ Operations - 语义操作模块
 按照plans.md要求独立化操作逻辑
 """
 
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
 from .index import CodeIndex, SearchQuery
+from .semantic_ops import caller_matches, definition_matches, reference_matches
 
 
 class SemanticOperations:
@@ -50,36 +51,44 @@ class SemanticOperations:
         }
 
     def analyze_symbol_usage(self, symbol_name: str) -> Dict[str, Any]:
-        """分析符号使用情况"""
-        definition = self.find_definition(symbol_name)
-        references = self.find_references(symbol_name)
-        callers = self.find_callers(symbol_name)
-
+        """分析符号使用情况 - 一次符号表查找直接组装，不走三次search分派"""
+        symbol_info = self.index.symbols.get(symbol_name)
+        if symbol_info is None:
+            definition: List[Dict[str, Any]] = []
+            references: List[Dict[str, Any]] = []
+            callers: List[Dict[str, Any]] = []
+        else:
+            definition = definition_matches(symbol_name, symbol_info)
+            references = reference_matches(symbol_name, symbol_info)
+            callers = caller_matches(self.index.symbols, symbol_info)
+
+        usage_count = len(references) + len(callers)
         return {
             "symbol": symbol_name,
-            "definition": definition["definition"],
-            "references": references["references"],
-            "callers": callers["callers"],
-            "usage_count": references["count"] + callers["count"],
-            "is_defined": definition["found"],
-            "is_used": references["count"] > 0 or callers["count"] > 0,
+            "definition": definition,
+            "references": references,
+            "callers": callers,
+            "usage_count": usage_count,
+            "is_defined": bool(definition),
+            "is_used": usage_count > 0,
         }
 
     def detect_unused_symbols(self) -> List[Dict[str, Any]]:
         """检测未使用的符号"""
-        unused = []
+        return list(self.iter_unused_symbols())
+
+    def iter_unused_symbols(self) -> Iterator[Dict[str, Any]]:
+        """逐个产出未使用的符号 - 调用方只取前N个时无需扫描全部符号"""
         for symbol_name, symbol_info in self.index.symbols.items():
             # 简单检测：没有引用和调用者的符号
-            if not symbol_info.references and not symbol_info.called_by:
-                unused.append(
-                    {
-                        "symbol": symbol_name,
-                        "type": symbol_info.type,
-                        "file": symbol_info.file,
-                        "line": symbol_info.line,
-                    }
-                )
-        return unused
+            if symbol_info.references or symbol_info.called_by:
+                continue
+            yield {
+                "symbol": symbol_name,
+                "type": symbol_info.type,
+                "file": symbol_info.file,
+                "line": symbol_info.line,
+            }
 
     def analyze_file_dependencies(self, file_path: str) -> Dict[str, Any]:
         """分析文件依赖关系"""
@@ -97,15 +106,14 @@ class SemanticOperations:
             "lines": file_info.line_count,
         }
 
-        # 查找使用此文件导出的其他文件
-        used_by = []
-        for other_path, other_info in self.index.files.items():
-            if other_path != file_path:
-                # 简单检测：其他文件导入了此文件的导出
-                for export in file_info.exports:
-                    if export in other_info.imports:
-                        used_by.append(other_path)
-                        break
+        # 查找使用此文件导出的其他文件 - 查导入反向索引，不再两两扫描
+        paths, importers = self.index.file_imports_index()
+        positions = set().union(*(importers.get(e, ()) for e in file_info.exports))
+        used_by = [
+            paths[position]
+            for position in sorted(positions)
+            if paths[position] != file_path
+        ]
 
         dependencies["used_by"] = used_by
         return dependencies
@@ -6,11 +6,24 @@ SCIP协议完整支持 - Linus风格直接数据操作
 """
 
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, cast
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple, cast
 
+try:
+    import orjson
 
-@dataclass
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+
+    _ORJSON_AVAILABLE = False
+
+# 流式导出的分隔符与整体序列化保持一致: orjson紧凑输出，标准库默认带空格
+_ITEM_SEP, _KEY_SEP = (b",", b":") if _ORJSON_AVAILABLE else (b", ", b": ")
+
+
+@dataclass(slots=True)
 class SCIPSymbol:
     """SCIP标准符号定义"""
 
@@ -27,9 +40,9 @@ class SCIPSymbol:
     definitions: List[str] = field(default_factory=list)  # 符号定义位置
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SCIPOccurrence:
-    """SCIP符号出现位置"""
+    """SCIP符号出现位置 - 创建后只读"""
 
     symbol_id: str
     file_path: str
@@ -39,7 +52,7 @@ class SCIPOccurrence:
     context: Optional[str] = None  # 上下文代码片段
 
 
-@dataclass
+@dataclass(slots=True)
 class SCIPDocument:
     """SCIP文档 - 单个文件的符号信息"""
 
@@ -50,6 +63,87 @@ class SCIPDocument:
     external_symbols: Set[str] = field(default_factory=set)  # 外部符号引用
 
 
+# SCIP标准类型/角色映射 - 模块级常量，导出时不再逐次重建字典
+_SCIP_KINDS: Dict[str, int] = {
+    "unknown": 0,
+    "file": 1,
+    "module": 2,
+    "namespace": 3,
+    "package": 4,
+    "class": 5,
+    "method": 6,
+    "property": 7,
+    "field": 8,
+    "constructor": 9,
+    "enum": 10,
+    "interface": 11,
+    "function": 12,
+    "variable": 13,
+    "constant": 14,
+    "string": 15,
+    "number": 16,
+    "boolean": 17,
+    "array": 18,
+    "object": 19,
+    "key": 20,
+    "null": 21,
+    "enum_member": 22,
+    "struct": 23,
+    "event": 24,
+    "operator": 25,
+    "type_parameter": 26,
+}
+
+_SCIP_ROLES: Dict[str, int] = {
+    "definition": 1,
+    "declaration": 2,
+    "reference": 4,
+    "implementation": 8,
+    "type_definition": 16,
+    "read": 32,
+    "write": 64,
+}
+
+# 出现类型判定常量 - frozenset成员测试为一次哈希查找
+_REFERENCE = "reference"
+_DEFINITION = "definition"
+_DEFINITION_TYPES = frozenset((_DEFINITION, "declaration"))
+
+
+def _occurrence_key(occurrence: SCIPOccurrence) -> Tuple[str, str]:
+    """出现位置索引键 - 定义与声明同桶以保持插入顺序，其余类型各自成桶"""
+    occurrence_type = occurrence.occurrence_type
+    if occurrence_type in _DEFINITION_TYPES:
+        occurrence_type = _DEFINITION
+    return occurrence.symbol_id, occurrence_type
+
+
+def _dumps_bytes(data: Any) -> bytes:
+    """序列化为UTF-8 JSON字节 - 优先使用orjson，不可用时回退标准库"""
+    if _ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+@lru_cache(maxsize=65536)
+def _normalize_path_cached(project_root: str, file_path: str) -> str:
+    """标准化文件路径 - 纯函数按(项目根, 路径)缓存，同一文件的符号只算一次"""
+    path = Path(file_path)
+    if path.is_absolute():
+        try:
+            return str(path.relative_to(project_root)).replace("\\", "/")
+        except ValueError:
+            pass  # 文件在项目外
+    return str(path).replace("\\", "/")
+
+
+def _build_symbol_id(
+    rel_path: str, language: str, symbol_type: str, symbol_name: str
+) -> str:
+    """拼接SCIP符号ID - 路径已标准化，无Path开销"""
+    return f"scip:{language}:file:{rel_path}:{symbol_type}:{symbol_name}"
+
+
 class SCIPSymbolManager:
     """
     SCIP符号管理器 - Linus风格统一数据操作
@@ -62,15 +156,14 @@ class SCIPSymbolManager:
         self.symbols: Dict[str, SCIPSymbol] = {}
         self.documents: Dict[str, SCIPDocument] = {}
         self.symbol_index: Dict[str, List[str]] = {}  # name -> symbol_ids
+        # (symbol_id, 类别) -> 出现位置，与documents同步维护
+        # 按类别分桶存放，解析引用/定义直接取桶，无需逐个判断出现类型
+        self._occurrence_index: Dict[Tuple[str, str], List[SCIPOccurrence]] = {}
 
         # Linus风格：操作注册表消除条件分支
+        # 只登记有专门逻辑的语言，其余直接落到通用处理器，不再多一层转发
         self._language_processors = {
             "python": self._process_python_symbol,
-            "javascript": self._process_javascript_symbol,
-            "typescript": self._process_typescript_symbol,
-            "java": self._process_java_symbol,
-            "go": self._process_go_symbol,
-            "zig": self._process_zig_symbol,
         }
 
     def generate_symbol_id(
@@ -86,16 +179,9 @@ class SCIPSymbolManager:
         格式: scip:<scheme>:<manager>:<namespace>:<symbol>
         例如: scip:python:file:/path/to/file.py:MyClass
         """
-        # 标准化文件路径
-        rel_path = self._normalize_path(file_path)
-
-        # 生成符号标识符
-        symbol_descriptor = f"{symbol_type}:{symbol_name}"
-
-        # SCIP标准格式
-        symbol_id = f"scip:{language}:file:{rel_path}:{symbol_descriptor}"
-
-        return symbol_id
+        return _build_symbol_id(
+            self._normalize_path(file_path), language, symbol_type, symbol_name
+        )
 
     def add_symbol(self, symbol: SCIPSymbol) -> None:
         """添加符号到索引 - 统一入口点"""
@@ -108,8 +194,11 @@ class SCIPSymbolManager:
 
     def find_symbol_by_name(self, name: str) -> List[SCIPSymbol]:
         """按名称查找符号 - 支持重载和多定义"""
-        symbol_ids = self.symbol_index.get(name, [])
-        return [self.symbols[sid] for sid in symbol_ids if sid in self.symbols]
+        symbol_ids = self.symbol_index.get(name)
+        if not symbol_ids:
+            return []
+        # map(dict.get)在C层完成逐个查找，每个ID只查一次字典
+        return [sym for sym in map(self.symbols.get, symbol_ids) if sym is not None]
 
     def find_symbol_by_id(self, symbol_id: str) -> Optional[SCIPSymbol]:
         """按SCIP ID查找符号"""
@@ -121,39 +210,38 @@ class SCIPSymbolManager:
 
         返回所有引用指定符号的位置
         """
-        references = []
-
-        for document in self.documents.values():
-            for occurrence in document.occurrences:
-                if (
-                    occurrence.symbol_id == symbol_id
-                    and occurrence.occurrence_type == "reference"
-                ):
-                    references.append(occurrence)
-
-        return references
+        return list(self._occurrence_index.get((symbol_id, _REFERENCE), ()))
 
     def resolve_definitions(self, symbol_id: str) -> List[SCIPOccurrence]:
         """解析符号定义位置"""
-        definitions = []
-
-        for document in self.documents.values():
-            for occurrence in document.occurrences:
-                if (
-                    occurrence.symbol_id == symbol_id
-                    and occurrence.occurrence_type
-                    in [
-                        "definition",
-                        "declaration",
-                    ]
-                ):
-                    definitions.append(occurrence)
-
-        return definitions
+        return list(self._occurrence_index.get((symbol_id, _DEFINITION), ()))
+
+    def add_occurrence(
+        self, document: SCIPDocument, occurrence: SCIPOccurrence
+    ) -> None:
+        """添加出现位置 - 同步更新文档和符号反向索引"""
+        document.occurrences.append(occurrence)
+        self._occurrence_index.setdefault(_occurrence_key(occurrence), []).append(
+            occurrence
+        )
+
+    def _remove_document_occurrences(self, document: SCIPDocument) -> None:
+        """文档被替换时移除其出现位置，保持索引与documents一致"""
+        stale = {id(occ) for occ in document.occurrences}
+        for key in {_occurrence_key(occ) for occ in document.occurrences}:
+            bucket = self._occurrence_index.get(key)
+            if bucket is None:
+                continue
+            bucket[:] = [occ for occ in bucket if id(occ) not in stale]
+            if not bucket:
+                del self._occurrence_index[key]
 
     def create_document(self, file_path: str, language: str) -> SCIPDocument:
         """创建SCIP文档"""
         doc = SCIPDocument(file_path=self._normalize_path(file_path), language=language)
+        previous = self.documents.get(doc.file_path)
+        if previous is not None:
+            self._remove_document_occurrences(previous)
         self.documents[doc.file_path] = doc
         return doc
 
@@ -172,22 +260,34 @@ class SCIPSymbolManager:
             language, self._process_generic_symbol
         )
 
+        # 热循环里只做局部变量访问: 文档列表、索引与绑定方法提前取出
+        # 定义出现位置的索引键固定，直接写桶，省掉add_occurrence的分类判断
+        doc_symbols = document.symbols
+        doc_occurrences = document.occurrences
+        occurrence_index = self._occurrence_index
+        add_symbol = self.add_symbol
+        doc_path = document.file_path
+
         for symbol_data in symbols:
             try:
                 scip_symbol = processor(symbol_data, file_path, language)
                 if scip_symbol:
-                    document.symbols.append(scip_symbol)
-                    self.add_symbol(scip_symbol)
+                    doc_symbols.append(scip_symbol)
+                    add_symbol(scip_symbol)
 
                     # 添加定义出现位置
+                    symbol_id = scip_symbol.symbol_id
                     occurrence = SCIPOccurrence(
-                        symbol_id=scip_symbol.symbol_id,
-                        file_path=document.file_path,
-                        line=scip_symbol.line,
-                        column=scip_symbol.column,
-                        occurrence_type="definition",
+                        symbol_id,
+                        doc_path,
+                        scip_symbol.line,
+                        scip_symbol.column,
+                        _DEFINITION,
+                    )
+                    doc_occurrences.append(occurrence)
+                    occurrence_index.setdefault((symbol_id, _DEFINITION), []).append(
+                        occurrence
                     )
-                    document.occurrences.append(occurrence)
 
             except Exception:
                 # 忽略处理错误，继续处理其他符号
@@ -227,13 +327,13 @@ class SCIPSymbolManager:
         if not symbol:
             return {}
 
+        # 引用只解析一次 - 每次解析都要遍历全部文档的出现位置
+        references = self.resolve_references(symbol_id)
         return {
             "symbol": symbol,
             "definitions": self.resolve_definitions(symbol_id),
-            "references": self.resolve_references(symbol_id),
-            "cross_file_usage": len(
-                set(occ.file_path for occ in self.resolve_references(symbol_id))
-            ),
+            "references": references,
+            "cross_file_usage": len({occ.file_path for occ in references}),
         }
 
     def export_scip_index(self) -> Dict[str, Any]:
@@ -243,188 +343,123 @@ class SCIPSymbolManager:
         符合SCIP协议的完整索引数据
         """
         return {
-            "metadata": {
-                "version": "0.3.0",
-                "tool_info": {"name": "code-index-mcp", "version": "1.0.0"},
-                "project_root": str(self.project_root),
-            },
-            "documents": [
-                {
-                    "relative_path": doc.file_path,
-                    "language": doc.language,
-                    "symbols": [
-                        {
-                            "symbol": sym.symbol_id,
-                            "kind": self._map_symbol_type_to_scip_kind(sym.symbol_type),
-                            "display_name": sym.name,
-                        }
-                        for sym in doc.symbols
-                    ],
-                    "occurrences": [
-                        {
-                            "range": self._create_scip_range(occ.line, occ.column),
-                            "symbol": occ.symbol_id,
-                            "symbol_roles": self._map_occurrence_type_to_roles(
-                                occ.occurrence_type
-                            ),
-                        }
-                        for occ in doc.occurrences
-                    ],
-                }
-                for doc in self.documents.values()
-            ],
-            "external_symbols": list(
-                set().union(*[doc.external_symbols for doc in self.documents.values()])
-            ),
+            "metadata": self._export_metadata(),
+            "documents": list(self.iter_export_documents()),
+            "external_symbols": self._export_external_symbols(),
         }
 
+    def export_scip_stream(self, fp: BinaryIO) -> Dict[str, Any]:
+        """
+        流式导出SCIP索引 - 文档逐个序列化写入fp，不构造完整的导出字典
+
+        写出的字节与序列化export_scip_index()结果一致，返回元数据和计数摘要。
+        """
+        metadata = self._export_metadata()
+        external_symbols = self._export_external_symbols()
+        write = fp.write
+
+        write(b'{"metadata"' + _KEY_SEP + _dumps_bytes(metadata))
+        write(_ITEM_SEP + b'"documents"' + _KEY_SEP + b"[")
+        document_count = 0
+        for document in self.iter_export_documents():
+            if document_count:
+                write(_ITEM_SEP)
+            write(_dumps_bytes(document))
+            document_count += 1
+        write(b"]" + _ITEM_SEP + b'"external_symbols"' + _KEY_SEP)
+        write(_dumps_bytes(external_symbols) + b"}")
+
+        return {
+            "metadata": metadata,
+            "document_count": document_count,
+            "external_symbols_count": len(external_symbols),
+        }
+
+    def iter_export_documents(self) -> Iterator[Dict[str, Any]]:
+        """逐个生成SCIP文档导出结构"""
+        kind_of = _SCIP_KINDS.get
+        role_of = _SCIP_ROLES.get
+        for doc in self.documents.values():
+            yield {
+                "relative_path": doc.file_path,
+                "language": doc.language,
+                "symbols": [
+                    {
+                        "symbol": sym.symbol_id,
+                        "kind": kind_of(sym.symbol_type, 0),
+                        "display_name": sym.name,
+                    }
+                    for sym in doc.symbols
+                ],
+                "occurrences": [
+                    {
+                        # SCIP范围 (start_line, start_col, end_line, end_col)，假设单字符符号
+                        "range": (occ.line, occ.column, occ.line, occ.column + 1),
+                        "symbol": occ.symbol_id,
+                        "symbol_roles": role_of(occ.occurrence_type, 4),
+                    }
+                    for occ in doc.occurrences
+                ],
+            }
+
+    def _export_metadata(self) -> Dict[str, Any]:
+        """导出元数据"""
+        return {
+            "version": "0.3.0",
+            "tool_info": {"name": "code-index-mcp", "version": "1.0.0"},
+            "project_root": str(self.project_root),
+        }
+
+    def _export_external_symbols(self) -> List[str]:
+        """汇总外部符号 - 单个集合就地累加"""
+        external: Set[str] = set()
+        for doc in self.documents.values():
+            external.update(doc.external_symbols)
+        return list(external)
+
     # 私有方法 - 语言特定处理器
 
     def _process_python_symbol(
         self, symbol_data: Dict[str, Any], file_path: str, language: str
     ) -> Optional[SCIPSymbol]:
         """Python符号处理器"""
-        symbol_id = self.generate_symbol_id(
-            symbol_data["name"], file_path, language, symbol_data.get("type", "unknown")
-        )
+        name = symbol_data["name"]
+        symbol_type = symbol_data.get("type", "unknown")
+        rel_path = self._normalize_path(file_path)
 
         return SCIPSymbol(
-            symbol_id=symbol_id,
-            name=symbol_data["name"],
+            symbol_id=_build_symbol_id(rel_path, language, symbol_type, name),
+            name=name,
             language=language,
-            file_path=self._normalize_path(file_path),
+            file_path=rel_path,
             line=symbol_data.get("line", 0),
             column=symbol_data.get("column", 0),
-            symbol_type=symbol_data.get("type", "unknown"),
+            symbol_type=symbol_type,
             signature=symbol_data.get("signature"),
             documentation=symbol_data.get("docstring"),
         )
 
-    def _process_javascript_symbol(
-        self, symbol_data: Dict[str, Any], file_path: str, language: str
-    ) -> Optional[SCIPSymbol]:
-        """JavaScript符号处理器"""
-        # JavaScript特定逻辑
-        return self._process_generic_symbol(symbol_data, file_path, language)
-
-    def _process_typescript_symbol(
-        self, symbol_data: Dict[str, Any], file_path: str, language: str
-    ) -> Optional[SCIPSymbol]:
-        """TypeScript符号处理器"""
-        # TypeScript特定逻辑，包含类型信息
-        return self._process_generic_symbol(symbol_data, file_path, language)
-
-    def _process_java_symbol(
-        self, symbol_data: Dict[str, Any], file_path: str, language: str
-    ) -> Optional[SCIPSymbol]:
-        """Java符号处理器"""
-        # Java特定逻辑，包含包名和访问修饰符
-        return self._process_generic_symbol(symbol_data, file_path, language)
-
-    def _process_go_symbol(
-        self, symbol_data: Dict[str, Any], file_path: str, language: str
-    ) -> Optional[SCIPSymbol]:
-        """Go符号处理器"""
-        # Go特定逻辑，包含包和接口信息
-        return self._process_generic_symbol(symbol_data, file_path, language)
-
-    def _process_zig_symbol(
-        self, symbol_data: Dict[str, Any], file_path: str, language: str
-    ) -> Optional[SCIPSymbol]:
-        """Zig符号处理器"""
-        # Zig特定逻辑
-        return self._process_generic_symbol(symbol_data, file_path, language)
-
     def _process_generic_symbol(
         self, symbol_data: Dict[str, Any], file_path: str, language: str
     ) -> Optional[SCIPSymbol]:
         """通用符号处理器 - 语言无关逻辑"""
-        symbol_id = self.generate_symbol_id(
-            symbol_data["name"], file_path, language, symbol_data.get("type", "unknown")
-        )
+        name = symbol_data["name"]
+        symbol_type = symbol_data.get("type", "unknown")
+        rel_path = self._normalize_path(file_path)
 
         return SCIPSymbol(
-            symbol_id=symbol_id,
-            name=symbol_data["name"],
+            symbol_id=_build_symbol_id(rel_path, language, symbol_type, name),
+            name=name,
             language=language,
-            file_path=self._normalize_path(file_path),
+            file_path=rel_path,
             line=symbol_data.get("line", 0),
             column=symbol_data.get("column", 0),
-            symbol_type=symbol_data.get("type", "unknown"),
+            symbol_type=symbol_type,
         )
 
     def _normalize_path(self, file_path: str) -> str:
         """标准化文件路径 - 统一路径处理"""
-        path = Path(file_path)
-        if path.is_absolute():
-            try:
-                rel_path = path.relative_to(self.project_root)
-                return str(rel_path).replace("\\", "/")
-            except ValueError:
-                # 文件在项目外
-                return str(path).replace("\\", "/")
-        return str(path).replace("\\", "/")
-
-    def _map_symbol_type_to_scip_kind(self, symbol_type: str) -> int:
-        """映射符号类型到SCIP标准类型"""
-        scip_kinds = {
-            "unknown": 0,
-            "file": 1,
-            "module": 2,
-            "namespace": 3,
-            "package": 4,
-            "class": 5,
-            "method": 6,
-            "property": 7,
-            "field": 8,
-            "constructor": 9,
-            "enum": 10,
-            "interface": 11,
-            "function": 12,
-            "variable": 13,
-            "constant": 14,
-            "string": 15,
-            "number": 16,
-            "boolean": 17,
-            "array": 18,
-            "object": 19,
-            "key": 20,
-            "null": 21,
-            "enum_member": 22,
-            "struct": 23,
-            "event": 24,
-            "operator": 25,
-            "type_parameter": 26,
-        }
-        return scip_kinds.get(symbol_type, 0)
-
-    def _map_occurrence_type_to_roles(self, occurrence_type: str) -> int:
-        """映射出现类型到SCIP角色"""
-        roles = {
-            "definition": 1,
-            "declaration": 2,
-            "reference": 4,
-            "implementation": 8,
-            "type_definition": 16,
-            "read": 32,
-            "write": 64,
-        }
-        return roles.get(occurrence_type, 4)  # 默认为引用
-
-    def _create_scip_range(
-        self,
-        line: int,
-        column: int,
-        end_line: Optional[int] = None,
-        end_column: Optional[int] = None,
-    ) -> List[int]:
-        """创建SCIP范围格式 [start_line, start_col, end_line, end_col]"""
-        if end_line is None:
-            end_line = line
-        if end_column is None:
-            end_column = column + 1  # 假设单字符符号
-
-        return [line, column, end_line, end_column]
+        return _normalize_path_cached(str(self.project_root), file_path)
 
 
 # 全局SCIP管理器实例
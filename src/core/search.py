@@ -4,25 +4,254 @@ Search Engine - Linus风格重构版本
 Phase 3并行搜索引擎 - 符合200行限制
 """
 
+import heapq
 import json
 import logging
+import os
 import re
 import shutil
 import subprocess
+import sys
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
 
 from .index import CodeIndex, SearchQuery, SearchResult
 from .search_cache import SearchCacheMixin
-from .search_parallel import ParallelSearchMixin
+from .search_parallel import (
+    ParallelSearchMixin,
+    compile_regex_cached,
+    iter_matching_lines,
+)
 
 # 设置日志记录
 logger = logging.getLogger(__name__)
 
+# 解析器: ripgrep输出行(bytes) -> 匹配结果
+RgParser = Callable[[Iterable[bytes]], Iterator[Dict[str, Any]]]
+
+
+@lru_cache(maxsize=8)
+def _which_rg(path_env: Optional[str]) -> Optional[str]:
+    return shutil.which("rg", path=path_env)
+
+
+def rg_executable() -> Optional[str]:
+    """rg绝对路径 - 按PATH缓存，查询不再逐目录扫描PATH，exec也不再搜索"""
+    return _which_rg(os.environ.get("PATH"))
+
+
+# 超长行(压缩JS、单行生成物)只输出前若干列预览，不把整行灌进管道
+_RG_MAX_COLUMNS = "512"
+
+
+def _rg_scope_args(query: SearchQuery) -> List[str]:
+    """rg范围参数 - file_pattern限定扫描的文件，超长行截成预览"""
+    args = ["--max-columns", _RG_MAX_COLUMNS, "--max-columns-preview"]
+    if query.file_pattern:
+        args.extend(["--glob", query.file_pattern])
+    return args
+
+
+def _rg_match_data(raw: bytes) -> Optional[Dict[str, Any]]:
+    """解析一行ripgrep JSON - 只返回match事件的data，其余事件和坏行返回None"""
+    try:
+        event = orjson.loads(raw) if _ORJSON_AVAILABLE else json.loads(raw)
+    except ValueError:
+        # 非UTF-8内容按原先的errors="ignore"语义丢弃坏字节再试
+        try:
+            event = json.loads(raw.decode("utf-8", "ignore"))
+        except ValueError:
+            return None
+    if not isinstance(event, dict) or event.get("type") != "match":
+        return None
+    return event["data"]
+
+
+# 符号类型规则表: 语言 -> 按优先级排列的(正则, 类型)，%s 代表转义后的符号名
+# 每种语言先试带符号名的精确模式，再试同类的通用模式
+_SYMBOL_TYPE_RULES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "python": (
+        (r"^(async\s+)?def\s+%s\s*\(", "function"),
+        (r"^(async\s+)?def\s+\w+\s*\(", "function"),
+        (r"^class\s+%s\b", "class"),
+        (r"^class\s+\w+", "class"),
+        (r"^%s\s*=", "variable"),
+        (r"^\w+\s*=", "variable"),
+        (r"^import\s+.*%s", "import"),
+        (r"^from\s+.*\s+import\s+.*%s", "import"),
+    ),
+    "javascript": (
+        (r"^function\s+%s\s*\(", "function"),
+        (r"^const\s+%s\s*=\s*(async\s+)?\(", "function"),
+        (r"^let\s+%s\s*=\s*(async\s+)?\(", "function"),
+        (r"^var\s+%s\s*=\s*(async\s+)?\(", "function"),
+        (r"^function\s+\w+\s*\(", "function"),
+        (r"^class\s+%s\b", "class"),
+        (r"^class\s+\w+", "class"),
+        (r"^(const|let|var)\s+%s\s*=", "variable"),
+        (r"^(const|let|var)\s+\w+\s*=", "variable"),
+        (r"^import\s+.*%s", "import"),
+        (r"^require\s*\([\"'].*%s", "import"),
+    ),
+    "java": (
+        (r"^(public|private|protected|static)?\s*(\w+\s+)*%s\s*\(", "method"),
+        (r"^(public|private|protected|static)?\s*(\w+\s+)*\w+\s*\(", "method"),
+        (r"^(public\s+)?class\s+%s\b", "class"),
+        (r"^(public\s+)?(abstract\s+)?class\s+\w+", "class"),
+        (r"^(public\s+)?interface\s+%s\b", "interface"),
+        (r"^(public\s+)?interface\s+\w+", "interface"),
+        (r"^(public\s+)?enum\s+%s\b", "enum"),
+        (r"^(public\s+)?enum\s+\w+", "enum"),
+        (
+            r"^(public|private|protected|static)?\s*(final\s+)?\w+\s+%s\s*[=;]",
+            "variable",
+        ),
+        (
+            r"^(public|private|protected|static)?\s*(final\s+)?\w+\s+\w+\s*[=;]",
+            "variable",
+        ),
+        (r"^import\s+.*%s", "import"),
+    ),
+    "c": (
+        (r"^(extern\s+)?(static\s+)?(inline\s+)?\w+\s+%s\s*\(", "function"),
+        (r"^(extern\s+)?(static\s+)?(inline\s+)?\w+\s+\w+\s*\(", "function"),
+        (r"^struct\s+%s\b", "struct"),
+        (r"^struct\s+\w+", "struct"),
+        (r"^union\s+%s\b", "union"),
+        (r"^union\s+\w+", "union"),
+        (r"^enum\s+%s\b", "enum"),
+        (r"^enum\s+\w+", "enum"),
+        (r"^(extern\s+)?(static\s+)?\w+\s+%s\s*[=;]", "variable"),
+        (r"^(extern\s+)?(static\s+)?\w+\s+\w+\s*[=;]", "variable"),
+        (r"#define\s+%s\b", "macro"),
+        (r"#define\s+\w+", "macro"),
+        (r'^#include\s+[<"]', "include"),
+    ),
+    "rust": (
+        (r"^(pub\s+)?(async\s+)?(unsafe\s+)?fn\s+%s\s*\(", "function"),
+        (r"^(pub\s+)?(async\s+)?(unsafe\s+)?fn\s+\w+\s*\(", "function"),
+        (r"^struct\s+%s\b", "struct"),
+        (r"^struct\s+\w+", "struct"),
+        (r"^enum\s+%s\b", "enum"),
+        (r"^enum\s+\w+", "enum"),
+        (r"^trait\s+%s\b", "trait"),
+        (r"^trait\s+\w+", "trait"),
+        (r"^(pub\s+)?(const\s+)?(static\s+)?\w+\s*:\s*\w+", "variable"),
+        (r"^mod\s+%s\b", "module"),
+        (r"^mod\s+\w+", "module"),
+        (r"^use\s+.*%s", "import"),
+        (r"^use\s+", "import"),
+    ),
+    "go": (
+        (r"^func\s+%s\s*\(", "function"),
+        (r"^func\s+\w+\s*\(", "function"),
+        (r"^type\s+%s\s+struct\b", "struct"),
+        (r"^type\s+\w+\s+struct\b", "struct"),
+        (r"^type\s+%s\s+interface\b", "interface"),
+        (r"^type\s+\w+\s+interface\b", "interface"),
+        (r"^var\s+%s\s+", "variable"),
+        (r"^var\s+\w+\s+", "variable"),
+        (r"^const\s+%s\s+", "constant"),
+        (r"^const\s+\w+\s+", "constant"),
+        (r"^import\s+.*%s", "import"),
+        (r"^import\s+", "import"),
+    ),
+    # 通用回退 - 不依赖符号名
+    "generic": (
+        (r"^def\s+\w+\s*\(", "function"),  # Python: def name(
+        (r"^function\s+\w+\s*\(", "function"),  # JavaScript: function name(
+        (r"^\w+\s*\([^)]*\)\s*[{:]", "function"),  # C/Java: name(...) { or :
+        (r"^\w+\s+operator\s*\(", "function"),  # C++: operator
+        (r"^async\s+def\s+\w+\s*\(", "function"),  # Python async
+        (r"^public\s+.*\s+\w+\s*\(", "function"),  # Java public method
+        (r"^private\s+.*\s+\w+\s*\(", "function"),  # Java private method
+        (r"^protected\s+.*\s+\w+\s*\(", "function"),  # Java protected method
+        (r"^static\s+.*\s+\w+\s*\(", "function"),  # Java/C# static method
+        (r"^class\s+\w+", "class"),  # Python/JavaScript: class Name
+        (r"^public\s+class\s+\w+", "class"),  # Java: public class Name
+        (r"^private\s+class\s+\w+", "class"),  # Java: private class Name
+        (r"^struct\s+\w+", "class"),  # C/C++: struct Name
+        (r"^interface\s+\w+", "class"),  # Java/C#: interface Name
+        (r"^enum\s+\w+", "class"),  # Java/C/C++: enum Name
+        (r"^const\s+\w+", "variable"),  # JavaScript/TypeScript: const name
+        (r"^let\s+\w+", "variable"),  # JavaScript/TypeScript: let name
+        (r"^var\s+\w+", "variable"),  # JavaScript: var name
+        (r"^final\s+\w+", "variable"),  # Java: final name
+        (r"^private\s+.*\s+\w+\s*[=;]", "variable"),  # Java private field
+        (r"^public\s+.*\s+\w+\s*[=;]", "variable"),  # Java public field
+        (r"^static\s+.*\s+\w+\s*[=;]", "variable"),  # Java/C# static field
+        (r"^\w+\s+\w+\s*[=;]", "variable"),  # General: type name = or ;
+        (r"^import\s+", "import"),  # Python/Java/TypeScript: import
+        (r"^from\s+.*\s+import", "import"),  # Python: from ... import
+        (r'^#include\s+[<"]', "import"),  # C/C++: #include
+        (r"^require\s*\(", "import"),  # Node.js: require(
+        (r"^using\s+", "import"),  # C#: using
+    ),
+}
+
+# 语言别名 -> 规则表，未登记的语言走通用回退
+_SYMBOL_TYPE_LANGUAGES: Dict[str, str] = {
+    "python": "python",
+    "py": "python",
+    "javascript": "javascript",
+    "js": "javascript",
+    "typescript": "javascript",
+    "ts": "javascript",
+    "java": "java",
+    "c": "c",
+    "cpp": "c",
+    "c++": "c",
+    "cc": "c",
+    "rust": "rust",
+    "rs": "rust",
+    "go": "go",
+}
+
+
+# 不含符号名占位的规则表: 融合正则与符号名无关，全局只编译一份
+_NAME_FREE_RULES = frozenset(
+    rules
+    for rules, table in _SYMBOL_TYPE_RULES.items()
+    if not any("%s" in pattern for pattern, _ in table)
+)
+
+
+@lru_cache(maxsize=256)
+def _symbol_type_matcher(
+    rules: str, symbol_name: str
+) -> Tuple["re.Pattern[str]", Dict[str, str]]:
+    """规则表融合为一条正则 - 每条规则是一个命名分支
+
+    所有规则都在行首匹配，分支按顺序尝试，首个成功的分支即原判断链的结果。
+    一次ripgrep查询内符号名不变，按(规则表, 符号名)缓存编译结果；
+    不含符号名的规则表由调用方传空名，所有查询共用一份。
+    """
+    name = re.escape(symbol_name)
+    branches = []
+    types = {}
+    for position, (pattern, symbol_type) in enumerate(_SYMBOL_TYPE_RULES[rules]):
+        branches.append(f"(?P<r{position}>{pattern.replace('%s', name)})")
+        types[f"r{position}"] = symbol_type
+    return re.compile("|".join(branches)), types
+
 
 class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
     """搜索引擎 - Linus风格组合设计"""
 
+    # 文本/正则的rg输出: 默认NUL分隔纯文本，需要--json事件(子匹配偏移等)时置True
+    rg_json_output = False
+
     def __init__(self, index: CodeIndex):
         ParallelSearchMixin.__init__(self, index)
         SearchCacheMixin.__init__(self, index)
@@ -66,7 +295,7 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
     def _search_text(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """文本搜索 - ripgrep优先，fallback到原实现"""
         # 检查ripgrep可用性
-        if shutil.which("rg"):
+        if rg_executable():
             return self._search_with_ripgrep(query)
 
         # Fallback到原实现
@@ -80,35 +309,31 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
         """单线程文本搜索"""
         pattern = query.pattern.lower() if not query.case_sensitive else query.pattern
         matches = []
-        for file_path, file_info in self.index.files.items():
-            lines = self._read_file_lines(file_path)
-            for line_num, line in enumerate(lines, 1):
-                search_line = line.lower() if not query.case_sensitive else line
-                if pattern in search_line:
-                    matches.append(
-                        {
-                            "file": file_path,
-                            "line": line_num,
-                            "content": line.strip(),
-                            "language": file_info.language,
-                        }
-                    )
-                    if query.limit and len(matches) >= query.limit:
-                        return matches
+        for file_path, file_info in self._query_files(query):
+            for line_num, line in self._iter_text_hits(
+                file_path, pattern, query.case_sensitive
+            ):
+                matches.append(
+                    {
+                        "file": file_path,
+                        "line": line_num,
+                        "content": line.strip(),
+                        "language": file_info.language,
+                    }
+                )
+                if query.limit and len(matches) >= query.limit:
+                    return matches
         return matches
 
     def _search_regex(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """正则搜索 - ripgrep优先，fallback到原实现"""
         # 检查ripgrep可用性
-        if shutil.which("rg"):
+        if rg_executable():
             return self._search_regex_with_ripgrep(query)
 
         # Fallback到原实现
-        try:
-            regex = re.compile(
-                query.pattern, 0 if query.case_sensitive else re.IGNORECASE
-            )
-        except re.error:
+        regex = compile_regex_cached(query.pattern, query.case_sensitive)
+        if regex is None:
             return []
 
         file_count = len(self.index.files)
@@ -120,20 +345,18 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
     def _search_regex_single(self, query: SearchQuery, regex) -> List[Dict[str, Any]]:
         """单线程正则搜索"""
         matches = []
-        for file_path, file_info in self.index.files.items():
-            lines = self._read_file_lines(file_path)
-            for line_num, line in enumerate(lines, 1):
-                if regex.search(line):
-                    matches.append(
-                        {
-                            "file": file_path,
-                            "line": line_num,
-                            "content": line.strip(),
-                            "language": file_info.language,
-                        }
-                    )
-                    if query.limit and len(matches) >= query.limit:
-                        return matches
+        for file_path, file_info in self._query_files(query):
+            for line_num, line in self._iter_regex_hits(file_path, regex):
+                matches.append(
+                    {
+                        "file": file_path,
+                        "line": line_num,
+                        "content": line.strip(),
+                        "language": file_info.language,
+                    }
+                )
+                if query.limit and len(matches) >= query.limit:
+                    return matches
         return matches
 
     def _search_symbol(self, query: SearchQuery) -> List[Dict[str, Any]]:
@@ -143,8 +366,10 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
         )
 
         try:
-            # 1. 优先使用索引搜索（最可靠）
-            index_matches = self._search_symbol_index(query)
+            # 1. 优先使用索引搜索（最可靠）；有limit时只取够前limit条就停
+            index_matches = self._search_symbol_prefix(query)
+            if index_matches is None:
+                index_matches = self._search_symbol_index(query)
             if index_matches:
                 logger.debug(f"Found {len(index_matches)} matches via index search")
                 return index_matches[: query.limit] if query.limit else index_matches
@@ -152,7 +377,7 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
             logger.debug("Index search returned no results, trying ripgrep fallback")
 
             # 2. fallback 到简单 ripgrep 搜索
-            if shutil.which("rg"):
+            if rg_executable():
                 rg_matches = self._search_symbol_simple_rg(query)
                 if rg_matches:
                     logger.debug(
@@ -172,77 +397,103 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
         logger.debug(f"No matches found for pattern: {query.pattern}")
         return []
 
+    def _search_symbol_prefix(
+        self, query: SearchQuery
+    ) -> Optional[List[Dict[str, Any]]]:
+        """limit快速路径 - 排序键上bisect定位精确/前缀区间
+
+        结果与_search_symbol_index()[:limit]一致；精确+前缀匹配不足limit时
+        只扫描到补足所需的子串匹配为止。无limit等无法bisect的情况返回None，
+        由调用方回退到全量扫描。
+        """
+        pattern = query.pattern if query.case_sensitive else query.pattern.lower()
+        limit = query.limit
+        if not limit or not pattern or ord(pattern[-1]) >= sys.maxunicode:
+            return None
+
+        keys, positions = self.index.sorted_symbol_keys(not query.case_sensitive)
+        start = bisect_left(keys, pattern)
+        exact_end = bisect_right(keys, pattern, start)
+        prefix_end = bisect_left(
+            keys, pattern[:-1] + chr(ord(pattern[-1]) + 1), exact_end
+        )
+
+        # 同一质量档内保持符号表原有顺序: 等键区间内序号本就递增
+        ranked = positions[start : min(exact_end, start + limit)]
+        if len(ranked) < limit:
+            ranked += heapq.nsmallest(
+                limit - len(ranked), positions[exact_end:prefix_end]
+            )
+        if len(ranked) < limit:
+            # 精确/前缀已全部到手，子串扫描跳过它们，找够剩余条数即停
+            keys, hits = self._symbol_key_hits(pattern, query.case_sensitive)
+            substring = (i for i in hits if not keys[i].startswith(pattern))
+            ranked += islice(substring, limit - len(ranked))
+        return self._symbol_matches(ranked)
+
+    def _symbol_key_hits(
+        self, pattern: str, case_sensitive: bool
+    ) -> Tuple[List[str], Iterable[int]]:
+        """包含pattern的符号键序号(符号表顺序) - 在拼接文本上整段find"""
+        keys, text = self.index.symbol_key_text(not case_sensitive)
+        if not keys:
+            return keys, ()
+        if text is not None:
+            return keys, iter_matching_lines(text, pattern, keys)
+        return keys, (i for i, key in enumerate(keys) if pattern in key)
+
+    def _symbol_matches(self, ranked: Iterable[int]) -> List[Dict[str, Any]]:
+        """按符号表序号构造结果字典"""
+        names = self.index.lowercase_symbol_names()
+        symbols = self.index.symbols
+        matches = []
+        for position in ranked:
+            symbol_name = names[position][0]
+            symbol_info = symbols[symbol_name]
+            matches.append(
+                {
+                    "symbol": symbol_name,
+                    "type": symbol_info.type,
+                    "file": symbol_info.file,
+                    "line": symbol_info.line,
+                }
+            )
+        return matches
+
     def _search_symbol_index(self, query: SearchQuery) -> List[Dict[str, Any]]:
-        """索引符号搜索 - 支持精确、前缀、子串匹配"""
+        """索引符号搜索 - 支持精确、前缀、子串匹配，有limit时只返回前limit条"""
         logger.debug(f"Starting index symbol search for pattern: {query.pattern}")
 
         pattern = query.pattern.lower() if not query.case_sensitive else query.pattern
-        matches = []
 
         try:
-            total_symbols = len(self.index.symbols)
-            logger.debug(f"Searching through {total_symbols} indexed symbols")
+            symbols = self.index.symbols
+            logger.debug(f"Searching through {len(symbols)} indexed symbols")
 
-            for symbol_name, symbol_info in self.index.symbols.items():
-                search_name = (
-                    symbol_name.lower() if not query.case_sensitive else symbol_name
-                )
+            # 精确/前缀匹配都是子串匹配的特例: 一次包含测试，再按质量分桶
+            # 包含测试在拼接文本上整段find完成，只有命中的符号进入Python循环
+            keys, positions = self._symbol_key_hits(pattern, query.case_sensitive)
 
-                # 支持多种匹配策略
-                is_match = False
-                if query.case_sensitive:
-                    # 精确匹配
-                    if symbol_name == pattern:
-                        is_match = True
-                    # 前缀匹配
-                    elif symbol_name.startswith(pattern):
-                        is_match = True
-                    # 子串匹配
-                    elif pattern in symbol_name:
-                        is_match = True
+            # 按匹配质量排序：精确匹配 > 前缀匹配 > 子串匹配
+            # 分桶只记序号，结果字典只为最终返回的条目构造
+            limit = query.limit
+            exact: List[int] = []
+            prefix: List[int] = []
+            substring: List[int] = []
+            for position in positions:
+                search_name = keys[position]
+                if search_name == pattern:
+                    exact.append(position)
+                    if limit and len(exact) >= limit:
+                        break  # 后续不可能排到前limit条
+                elif search_name.startswith(pattern):
+                    prefix.append(position)
                 else:
-                    # 大小写不敏感匹配
-                    if search_name == pattern:
-                        is_match = True
-                    elif search_name.startswith(pattern):
-                        is_match = True
-                    elif pattern in search_name:
-                        is_match = True
-
-                if is_match:
-                    matches.append(
-                        {
-                            "symbol": symbol_name,
-                            "type": symbol_info.type,
-                            "file": symbol_info.file,
-                            "line": symbol_info.line,
-                        }
-                    )
+                    substring.append(position)
 
+            ranked = exact + prefix + substring
+            matches = self._symbol_matches(ranked[:limit] if limit else ranked)
             logger.debug(f"Index search found {len(matches)} potential matches")
-
-            # 按匹配质量排序：精确匹配 > 前缀匹配 > 子串匹配
-            if query.case_sensitive:
-                matches.sort(
-                    key=lambda m: (
-                        0
-                        if str(m["symbol"]) == pattern
-                        else 1
-                        if str(m["symbol"]).startswith(pattern)
-                        else 2
-                    )
-                )
-            else:
-                matches.sort(
-                    key=lambda m: (
-                        0
-                        if str(m["symbol"]).lower() == pattern
-                        else 1
-                        if str(m["symbol"]).lower().startswith(pattern)
-                        else 2
-                    )
-                )
-
             return matches
 
         except Exception as e:
@@ -252,7 +503,8 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
     def _search_symbol_simple_rg(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """简化的ripgrep符号搜索 - 使用更简单的模式"""
         # 使用简单的词边界搜索
-        cmd = ["rg", "--json", "--line-number", "-w"]
+        cmd = [rg_executable() or "rg", "--json", "--line-number", "-w"]
+        cmd.extend(_rg_scope_args(query))
         if not query.case_sensitive:
             cmd.append("--ignore-case")
         if query.limit:
@@ -260,38 +512,31 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
 
         cmd.extend([query.pattern, self.index.base_path])
 
-        output = self._run_ripgrep_command(cmd)
-        if output:
-            return self._parse_rg_symbol_output(output, query.pattern)
-        else:
-            return []
+        matches = self._run_ripgrep_command(
+            cmd,
+            lambda lines: self._parse_rg_symbol_output(lines, query.pattern),
+            query.limit,
+        )
+        return matches or []
 
     def _find_references(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """查找引用 - 最简实现"""
         symbol_info = self.index.symbols.get(query.pattern)
         if not symbol_info:
             return []
-        return (
-            [
-                {
-                    "file": ref.split(":")[0],
-                    "line": int(ref.split(":")[1]),
-                    "type": "reference",
-                }
-                for ref in symbol_info.references
-                if ":" in ref
-            ][: query.limit]
-            if query.limit
-            else [
-                {
-                    "file": ref.split(":")[0],
-                    "line": int(ref.split(":")[1]),
-                    "type": "reference",
-                }
-                for ref in symbol_info.references
-                if ":" in ref
-            ]
+        # partition一次C调用拆出"file:line"，无需两次split生成列表
+        matches = (
+            {
+                "file": file_part,
+                "line": int(rest.partition(":")[0]),
+                "type": "reference",
+            }
+            for file_part, sep, rest in (
+                ref.partition(":") for ref in symbol_info.references
+            )
+            if sep
         )
+        return list(islice(matches, query.limit)) if query.limit else list(matches)
 
     def _find_definition(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """查找定义 - 最简实现"""
@@ -307,9 +552,10 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
         symbol_info = self.index.symbols.get(query.pattern)
         if not symbol_info:
             return []
+        get_symbol = self.index.symbols.get
         matches = []
         for caller in symbol_info.called_by:
-            caller_info = self.index.symbols.get(caller)
+            caller_info = get_symbol(caller)
             if caller_info:
                 matches.append(
                     {
@@ -323,26 +569,50 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
                     break
         return matches
 
-    def _run_ripgrep_command(self, cmd: List[str], timeout: int = 30) -> Optional[str]:
-        """公共的ripgrep命令执行方法 - 统一错误处理和超时"""
+    def _run_ripgrep_command(
+        self,
+        cmd: List[str],
+        parse: RgParser,
+        limit: Optional[int] = None,
+        timeout: int = 30,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """公共的ripgrep命令执行方法 - 流式解析，够limit立即终止rg
+
+        边读stdout边解析，不再整段缓冲输出；超时由定时器杀进程。
+        未提前终止时按退出码判断，非0(无匹配/出错/超时)返回None。
+        """
         try:
-            result = subprocess.run(
+            # stdin不继承: MCP服务的stdin是协议管道，子进程不该碰
+            proc = subprocess.Popen(
                 cmd,
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="ignore",
-                timeout=timeout,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
             )
-            if result.returncode == 0 and result.stdout:
-                return result.stdout
-            return None
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError):
+        except (OSError, subprocess.SubprocessError):
             return None
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+        try:
+            matches = parse(proc.stdout)  # type: ignore[arg-type]
+            if limit:
+                results = list(islice(matches, limit))
+                if len(results) >= limit:
+                    return results
+            else:
+                results = list(matches)
+            return results if proc.wait() == 0 else None
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            proc.stdout.close()  # type: ignore[union-attr]
 
     def _search_with_ripgrep(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """ripgrep搜索实现 - 高性能文本搜索"""
-        cmd = ["rg", "--json", "--line-number"]
+        output_args, parse = self._rg_output_mode()
+        cmd = [rg_executable() or "rg", *output_args, *_rg_scope_args(query)]
         if not query.case_sensitive:
             cmd.append("--ignore-case")
         if query.limit:
@@ -350,33 +620,58 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
 
         cmd.extend([query.pattern, self.index.base_path])
 
-        output = self._run_ripgrep_command(cmd)
-        if output:
-            return self._parse_rg_output(output)
+        matches = self._run_ripgrep_command(cmd, parse, query.limit)
+        if matches is not None:
+            return matches
         else:
             # Fallback到原实现
             return self._search_text_single(query)
 
-    def _parse_rg_output(self, output: str) -> List[Dict[str, Any]]:
-        """解析ripgrep JSON输出"""
-        matches = []
-        for line in output.strip().split("\n"):
-            if line:
-                try:
-                    data = json.loads(line)
-                    if data.get("type") == "match":
-                        file_path = data["data"]["path"]["text"]
-                        matches.append(
-                            {
-                                "file": file_path,
-                                "line": data["data"]["line_number"],
-                                "content": data["data"]["lines"]["text"].strip(),
-                                "language": self._detect_language(file_path),
-                            }
-                        )
-                except json.JSONDecodeError:
-                    continue
-        return matches
+    def _rg_output_mode(self) -> Tuple[List[str], RgParser]:
+        """rg输出参数与对应解析器 - 只要(文件, 行号, 内容)时不付JSON序列化的钱"""
+        if self.rg_json_output:
+            return ["--json", "--line-number"], self._parse_rg_output
+        plain = ["--no-heading", "--with-filename", "--line-number", "--null"]
+        return plain, self._parse_rg_null_output
+
+    def _parse_rg_null_output(
+        self, lines: Iterable[bytes]
+    ) -> Iterator[Dict[str, Any]]:
+        """解析rg --null纯文本输出 - 每行"路径\\0行号:内容"，其余行跳过"""
+        last_path = file_path = language = None
+        for raw in lines:
+            path, sep, rest = raw.partition(b"\0")
+            line_number, colon, content = rest.partition(b":")
+            # 二进制文件提示等非匹配行没有数字行号
+            if not (sep and colon and line_number.isdigit()):
+                continue
+            if path != last_path:
+                last_path, file_path = path, path.decode("utf-8", "ignore")
+                language = self._detect_language(file_path)
+            yield {
+                "file": file_path,
+                "line": int(line_number),
+                "content": content.decode("utf-8", "ignore").strip(),
+                "language": language,
+            }
+
+    def _parse_rg_output(self, lines: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+        """解析ripgrep JSON输出 - 逐行产出，调用方决定读多少"""
+        # rg按文件成批输出命中，语言只在换文件时查一次
+        last_path = language = None
+        for raw in lines:
+            data = _rg_match_data(raw)
+            if data is None:
+                continue
+            file_path = data["path"]["text"]
+            if file_path != last_path:
+                last_path, language = file_path, self._detect_language(file_path)
+            yield {
+                "file": file_path,
+                "line": data["line_number"],
+                "content": data["lines"]["text"].strip(),
+                "language": language,
+            }
 
     def _detect_language(self, file_path: str) -> str:
         """检测文件语言类型"""
@@ -385,26 +680,23 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
 
     def _search_regex_with_ripgrep(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """ripgrep正则搜索实现 - 高性能正则搜索"""
-        cmd = ["rg", "--json", "--line-number", "--regexp"]
+        output_args, parse = self._rg_output_mode()
+        cmd = [rg_executable() or "rg", *output_args, *_rg_scope_args(query)]
         if not query.case_sensitive:
             cmd.append("--ignore-case")
         if query.limit:
             cmd.extend(["--max-count", str(query.limit)])
 
-        cmd.extend([query.pattern, self.index.base_path])
+        # --regexp带参数，必须紧挨模式，否则会把后面的选项吞作模式
+        cmd.extend(["--regexp", query.pattern, self.index.base_path])
 
-        output = self._run_ripgrep_command(cmd)
-        if output:
-            return self._parse_rg_output(output)
+        matches = self._run_ripgrep_command(cmd, parse, query.limit)
+        if matches is not None:
+            return matches
         else:
             # Fallback到原实现
-            try:
-                regex = re.compile(
-                    query.pattern, 0 if query.case_sensitive else re.IGNORECASE
-                )
-                return self._search_regex_single(query, regex)
-            except re.error:
-                return []
+            regex = compile_regex_cached(query.pattern, query.case_sensitive)
+            return self._search_regex_single(query, regex) if regex else []
 
     def _search_symbol_with_ripgrep(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """简化的ripgrep符号搜索实现 - 使用简单模式"""
@@ -412,409 +704,58 @@ class SearchEngine(ParallelSearchMixin, SearchCacheMixin):
         return self._search_symbol_simple_rg(query)
 
     def _search_symbol_fallback(self, query: SearchQuery) -> List[Dict[str, Any]]:
-        """符号搜索fallback实现"""
+        """符号搜索fallback实现 - 符号表顺序的子串匹配，不分质量档"""
         pattern = query.pattern.lower() if not query.case_sensitive else query.pattern
-        matches = []
-        for symbol_name, symbol_info in self.index.symbols.items():
-            search_name = (
-                symbol_name.lower() if not query.case_sensitive else symbol_name
-            )
-            if pattern in search_name:
-                matches.append(
-                    {
-                        "symbol": symbol_name,
-                        "type": symbol_info.type,
-                        "file": symbol_info.file,
-                        "line": symbol_info.line,
-                    }
-                )
-                if query.limit and len(matches) >= query.limit:
-                    break
-        return matches
+        _, hits = self._symbol_key_hits(pattern, query.case_sensitive)
+        return self._symbol_matches(islice(hits, query.limit) if query.limit else hits)
 
     def _parse_rg_symbol_output(
-        self, output: str, pattern: str
-    ) -> List[Dict[str, Any]]:
-        """解析ripgrep符号搜索输出"""
-        matches = []
-        for line in output.strip().split("\n"):
-            if line:
-                try:
-                    data = json.loads(line)
-                    if data.get("type") == "match":
-                        file_path = data["data"]["path"]["text"]
-                        line_content = data["data"]["lines"]["text"].strip()
-
-                        # 尝试检测符号类型
-                        language = self._detect_language(file_path)
-                        symbol_type = self._detect_symbol_type(
-                            line_content, pattern, language
-                        )
-
-                        matches.append(
-                            {
-                                "symbol": pattern,
-                                "type": symbol_type,
-                                "file": file_path,
-                                "line": data["data"]["line_number"],
-                                "content": line_content,
-                                "language": self._detect_language(file_path),
-                            }
-                        )
-                except json.JSONDecodeError:
-                    continue
-        return matches
+        self, lines: Iterable[bytes], pattern: str
+    ) -> Iterator[Dict[str, Any]]:
+        """解析ripgrep符号搜索输出 - 逐行产出"""
+        last_path = language = None
+        for raw in lines:
+            data = _rg_match_data(raw)
+            if data is None:
+                continue
+            file_path = data["path"]["text"]
+            line_content = data["lines"]["text"].strip()
+
+            # 尝试检测符号类型
+            if file_path != last_path:
+                last_path, language = file_path, self._detect_language(file_path)
+            symbol_type = self._detect_symbol_type(line_content, pattern, language)
+
+            yield {
+                "symbol": pattern,
+                "type": symbol_type,
+                "file": file_path,
+                "line": data["line_number"],
+                "content": line_content,
+                "language": language,
+            }
 
     def _detect_symbol_type(
         self, line_content: str, symbol_name: str, language: str = "unknown"
     ) -> str:
-        """检测符号类型 - 增强版本，支持语言特定检测"""
-        line = line_content.strip()
-        line_lower = line.lower()
-
-        # 语言特定的检测策略
-        if language in ["python", "py"]:
-            return self._detect_python_symbol_type(line, symbol_name)
-        elif language in ["javascript", "js", "typescript", "ts"]:
-            return self._detect_javascript_symbol_type(line, symbol_name)
-        elif language in ["java"]:
-            return self._detect_java_symbol_type(line, symbol_name)
-        elif language in ["c", "cpp", "c++", "cc"]:
-            return self._detect_c_symbol_type(line, symbol_name)
-        elif language in ["rust", "rs"]:
-            return self._detect_rust_symbol_type(line, symbol_name)
-        elif language in ["go"]:
-            return self._detect_go_symbol_type(line, symbol_name)
-        else:
-            # 通用检测
-            return self._detect_generic_symbol_type(line, symbol_name)
-
-    def _detect_python_symbol_type(self, line: str, symbol_name: str) -> str:
-        """Python符号类型检测"""
-        # 函数检测
-        if re.match(r"^(async\s+)?def\s+" + re.escape(symbol_name) + r"\s*\(", line):
-            return "function"
-        elif re.match(r"^(async\s+)?def\s+\w+\s*\(", line):
-            return "function"
-
-        # 类检测
-        elif re.match(r"^class\s+" + re.escape(symbol_name) + r"\b", line):
-            return "class"
-        elif re.match(r"^class\s+\w+", line):
-            return "class"
-
-        # 变量检测
-        elif re.match(r"^" + re.escape(symbol_name) + r"\s*=", line):
-            return "variable"
-        elif re.match(r"^\w+\s*=", line):
-            return "variable"
-
-        # 导入检测
-        elif re.match(r"^import\s+.*" + re.escape(symbol_name), line):
-            return "import"
-        elif re.match(r"^from\s+.*\s+import\s+.*" + re.escape(symbol_name), line):
-            return "import"
-
-        return "unknown"
-
-    def _detect_javascript_symbol_type(self, line: str, symbol_name: str) -> str:
-        """JavaScript/TypeScript符号类型检测"""
-        # 函数检测
-        if re.match(r"^function\s+" + re.escape(symbol_name) + r"\s*\(", line):
-            return "function"
-        elif re.match(
-            r"^const\s+" + re.escape(symbol_name) + r"\s*=\s*(async\s+)?\(", line
-        ):
-            return "function"
-        elif re.match(
-            r"^let\s+" + re.escape(symbol_name) + r"\s*=\s*(async\s+)?\(", line
-        ):
-            return "function"
-        elif re.match(
-            r"^var\s+" + re.escape(symbol_name) + r"\s*=\s*(async\s+)?\(", line
-        ):
-            return "function"
-        elif re.match(r"^function\s+\w+\s*\(", line):
-            return "function"
-
-        # 类检测
-        elif re.match(r"^class\s+" + re.escape(symbol_name) + r"\b", line):
-            return "class"
-        elif re.match(r"^class\s+\w+", line):
-            return "class"
-
-        # 变量检测
-        elif re.match(r"^(const|let|var)\s+" + re.escape(symbol_name) + r"\s*=", line):
-            return "variable"
-        elif re.match(r"^(const|let|var)\s+\w+\s*=", line):
-            return "variable"
-
-        # 导入检测
-        elif re.match(r"^import\s+.*" + re.escape(symbol_name), line):
-            return "import"
-        elif re.match(r"^require\s*\([\"'].*" + re.escape(symbol_name), line):
-            return "import"
+        """检测符号类型 - 增强版本，支持语言特定检测
 
-        return "unknown"
-
-    def _detect_java_symbol_type(self, line: str, symbol_name: str) -> str:
-        """Java符号类型检测"""
-        # 方法检测
-        if re.match(
-            r"^(public|private|protected|static)?\s*(\w+\s+)*"
-            + re.escape(symbol_name)
-            + r"\s*\(",
-            line,
-        ):
-            return "method"
-        elif re.match(r"^(public|private|protected|static)?\s*(\w+\s+)*\w+\s*\(", line):
-            return "method"
-
-        # 类检测
-        elif re.match(r"^(public\s+)?class\s+" + re.escape(symbol_name) + r"\b", line):
-            return "class"
-        elif re.match(r"^(public\s+)?(abstract\s+)?class\s+\w+", line):
-            return "class"
-
-        # 接口检测
-        elif re.match(
-            r"^(public\s+)?interface\s+" + re.escape(symbol_name) + r"\b", line
-        ):
-            return "interface"
-        elif re.match(r"^(public\s+)?interface\s+\w+", line):
-            return "interface"
-
-        # 枚举检测
-        elif re.match(r"^(public\s+)?enum\s+" + re.escape(symbol_name) + r"\b", line):
-            return "enum"
-        elif re.match(r"^(public\s+)?enum\s+\w+", line):
-            return "enum"
-
-        # 变量检测
-        elif re.match(
-            r"^(public|private|protected|static)?\s*(final\s+)?\w+\s+"
-            + re.escape(symbol_name)
-            + r"\s*[=;]",
-            line,
-        ):
-            return "variable"
-        elif re.match(
-            r"^(public|private|protected|static)?\s*(final\s+)?\w+\s+\w+\s*[=;]", line
-        ):
-            return "variable"
-
-        # 导入检测
-        elif re.match(r"^import\s+.*" + re.escape(symbol_name), line):
-            return "import"
-
-        return "unknown"
-
-    def _detect_c_symbol_type(self, line: str, symbol_name: str) -> str:
-        """C/C++符号类型检测"""
-        # 函数检测
-        if re.match(
-            r"^(extern\s+)?(static\s+)?(inline\s+)?\w+\s+"
-            + re.escape(symbol_name)
-            + r"\s*\(",
-            line,
-        ):
-            return "function"
-        elif re.match(r"^(extern\s+)?(static\s+)?(inline\s+)?\w+\s+\w+\s*\(", line):
-            return "function"
-
-        # 结构体检测
-        elif re.match(r"^struct\s+" + re.escape(symbol_name) + r"\b", line):
-            return "struct"
-        elif re.match(r"^struct\s+\w+", line):
-            return "struct"
-
-        # 联合体检测
-        elif re.match(r"^union\s+" + re.escape(symbol_name) + r"\b", line):
-            return "union"
-        elif re.match(r"^union\s+\w+", line):
-            return "union"
-
-        # 枚举检测
-        elif re.match(r"^enum\s+" + re.escape(symbol_name) + r"\b", line):
-            return "enum"
-        elif re.match(r"^enum\s+\w+", line):
-            return "enum"
-
-        # 变量检测
-        elif re.match(
-            r"^(extern\s+)?(static\s+)?\w+\s+" + re.escape(symbol_name) + r"\s*[=;]",
-            line,
-        ):
-            return "variable"
-        elif re.match(r"^(extern\s+)?(static\s+)?\w+\s+\w+\s*[=;]", line):
-            return "variable"
-
-        # 宏定义检测
-        elif re.match(r"#define\s+" + re.escape(symbol_name) + r"\b", line):
-            return "macro"
-        elif re.match(r"#define\s+\w+", line):
-            return "macro"
-
-        # 包含检测
-        elif re.match(r'^#include\s+[<"]', line):
-            return "include"
-
-        return "unknown"
-
-    def _detect_rust_symbol_type(self, line: str, symbol_name: str) -> str:
-        """Rust符号类型检测"""
-        # 函数检测
-        if re.match(
-            r"^(pub\s+)?(async\s+)?(unsafe\s+)?fn\s+"
-            + re.escape(symbol_name)
-            + r"\s*\(",
-            line,
-        ):
-            return "function"
-        elif re.match(r"^(pub\s+)?(async\s+)?(unsafe\s+)?fn\s+\w+\s*\(", line):
-            return "function"
-
-        # 结构体检测
-        elif re.match(r"^struct\s+" + re.escape(symbol_name) + r"\b", line):
-            return "struct"
-        elif re.match(r"^struct\s+\w+", line):
-            return "struct"
-
-        # 枚举检测
-        elif re.match(r"^enum\s+" + re.escape(symbol_name) + r"\b", line):
-            return "enum"
-        elif re.match(r"^enum\s+\w+", line):
-            return "enum"
-
-        # 特征检测
-        elif re.match(r"^trait\s+" + re.escape(symbol_name) + r"\b", line):
-            return "trait"
-        elif re.match(r"^trait\s+\w+", line):
-            return "trait"
-
-        # 变量检测
-        elif re.match(r"^(pub\s+)?(const\s+)?(static\s+)?\w+\s*:\s*\w+", line):
-            return "variable"
-
-        # 模块检测
-        elif re.match(r"^mod\s+" + re.escape(symbol_name) + r"\b", line):
-            return "module"
-        elif re.match(r"^mod\s+\w+", line):
-            return "module"
-
-        # 使用检测
-        elif re.match(r"^use\s+.*" + re.escape(symbol_name), line):
-            return "import"
-        elif re.match(r"^use\s+", line):
-            return "import"
-
-        return "unknown"
-
-    def _detect_go_symbol_type(self, line: str, symbol_name: str) -> str:
-        """Go符号类型检测"""
-        # 函数检测
-        if re.match(r"^func\s+" + re.escape(symbol_name) + r"\s*\(", line):
-            return "function"
-        elif re.match(r"^func\s+\w+\s*\(", line):
-            return "function"
-
-        # 结构体检测
-        elif re.match(r"^type\s+" + re.escape(symbol_name) + r"\s+struct\b", line):
-            return "struct"
-        elif re.match(r"^type\s+\w+\s+struct\b", line):
-            return "struct"
-
-        # 接口检测
-        elif re.match(r"^type\s+" + re.escape(symbol_name) + r"\s+interface\b", line):
-            return "interface"
-        elif re.match(r"^type\s+\w+\s+interface\b", line):
-            return "interface"
-
-        # 变量检测
-        elif re.match(r"^var\s+" + re.escape(symbol_name) + r"\s+", line):
-            return "variable"
-        elif re.match(r"^var\s+\w+\s+", line):
-            return "variable"
-
-        # 常量检测
-        elif re.match(r"^const\s+" + re.escape(symbol_name) + r"\s+", line):
-            return "constant"
-        elif re.match(r"^const\s+\w+\s+", line):
-            return "constant"
-
-        # 导入检测
-        elif re.match(r"^import\s+.*" + re.escape(symbol_name), line):
-            return "import"
-        elif re.match(r"^import\s+", line):
-            return "import"
-
-        return "unknown"
-
-    def _detect_generic_symbol_type(self, line: str, symbol_name: str) -> str:
-        """通用符号类型检测 - 回退方案"""
-        # 函数检测 - 更精确的模式
-        function_patterns = [
-            r"^def\s+\w+\s*\(",  # Python: def name(
-            r"^function\s+\w+\s*\(",  # JavaScript: function name(
-            r"^\w+\s*\([^)]*\)\s*[{:]",  # C/Java: name(...) { or :
-            r"^\w+\s+operator\s*\(",  # C++: operator
-            r"^async\s+def\s+\w+\s*\(",  # Python async
-            r"^public\s+.*\s+\w+\s*\(",  # Java public method
-            r"^private\s+.*\s+\w+\s*\(",  # Java private method
-            r"^protected\s+.*\s+\w+\s*\(",  # Java protected method
-            r"^static\s+.*\s+\w+\s*\(",  # Java/C# static method
-        ]
-
-        for pattern in function_patterns:
-            if re.search(pattern, line):
-                return "function"
-
-        # 类检测
-        class_patterns = [
-            r"^class\s+\w+",  # Python/JavaScript: class Name
-            r"^public\s+class\s+\w+",  # Java: public class Name
-            r"^private\s+class\s+\w+",  # Java: private class Name
-            r"^struct\s+\w+",  # C/C++: struct Name
-            r"^interface\s+\w+",  # Java/C#: interface Name
-            r"^enum\s+\w+",  # Java/C/C++: enum Name
-        ]
-
-        for pattern in class_patterns:
-            if re.search(pattern, line):
-                return "class"
-
-        # 变量检测
-        variable_patterns = [
-            r"^const\s+\w+",  # JavaScript/TypeScript: const name
-            r"^let\s+\w+",  # JavaScript/TypeScript: let name
-            r"^var\s+\w+",  # JavaScript: var name
-            r"^final\s+\w+",  # Java: final name
-            r"^private\s+.*\s+\w+\s*[=;]",  # Java private field
-            r"^public\s+.*\s+\w+\s*[=;]",  # Java public field
-            r"^static\s+.*\s+\w+\s*[=;]",  # Java/C# static field
-            r"^\w+\s+\w+\s*[=;]",  # General: type name = or ;
-        ]
-
-        for pattern in variable_patterns:
-            if re.search(pattern, line):
-                return "variable"
-
-        # 导入检测
-        import_patterns = [
-            r"^import\s+",  # Python/Java/TypeScript: import
-            r"^from\s+.*\s+import",  # Python: from ... import
-            r'^#include\s+[<"]',  # C/C++: #include
-            r"^require\s*\(",  # Node.js: require(
-            r"^using\s+",  # C#: using
-        ]
-
-        for pattern in import_patterns:
-            if re.search(pattern, line):
-                return "import"
-
-        # 方法检测（类中的函数）
-        if symbol_name in line and any(
-            keyword in line for keyword in ["def ", "function ", "operator "]
+        规则表按原判断顺序融合成一条正则，一次match给出首个命中的规则。
+        """
+        line = line_content.strip()
+        rules = _SYMBOL_TYPE_LANGUAGES.get(language, "generic")
+        regex, types = _symbol_type_matcher(
+            rules, "" if rules in _NAME_FREE_RULES else symbol_name
+        )
+        match = regex.match(line)
+        if match:
+            return types[match.lastgroup]  # type: ignore[index]
+
+        # 方法检测（类中的函数）- 仅通用回退
+        if (
+            rules == "generic"
+            and symbol_name in line
+            and any(keyword in line for keyword in ["def ", "function ", "operator "])
         ):
             return "method"
 
@@ -5,23 +5,72 @@ Linus风格直接数据操作 - 文件依赖感知缓存
 """
 
 import hashlib
-import time
+from collections import OrderedDict
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional, Set
+from typing import Any, Dict, Optional, Set, Tuple
 
 from .index import CodeIndex, SearchQuery, SearchResult
+from .search_parallel import matches_file_pattern
+
+# 查询键直接用字段元组 - 命中路径不再拼字符串算md5
+QueryKey = Tuple[str, str, Optional[str], bool, Optional[int]]
+
+
+def _query_key(query: SearchQuery) -> QueryKey:
+    return (
+        query.type,
+        query.pattern,
+        query.file_pattern,
+        query.case_sensitive,
+        query.limit,
+    )
+
+
+def _covers(
+    cached_limit: Optional[int], result: SearchResult, limit: Optional[int]
+) -> bool:
+    """缓存结果的前limit条是否就是limit查询的答案
+
+    各搜索都按确定顺序产出、到limit截断: 未截断(无上限或不足上限)的结果
+    是完整答案，截断的结果只能回答不超过其上限的查询。
+    """
+    if not cached_limit or len(result.matches) < cached_limit:
+        return True
+    return limit is not None and 0 < limit <= cached_limit
+
+
+def _index_generation(index: CodeIndex) -> Tuple[int, int, int]:
+    """索引代数 - 字典被整体替换时id也会变"""
+    return (id(index.files), id(index.symbols), index._generation)
+
+
+def _key_digest(key: QueryKey) -> str:
+    """字段元组 -> 向后兼容的md5字符串键"""
+    query_type, pattern, file_pattern, case_sensitive, limit = key
+    query_data = {
+        "type": query_type,
+        "pattern": pattern,
+        "file_pattern": file_pattern,
+        "case_sensitive": case_sensitive,
+        "limit": limit,
+    }
+    query_str = "|".join(f"{k}:{v}" for k, v in sorted(query_data.items()))
+    return f"query_{hashlib.md5(query_str.encode()).hexdigest()}"
 
 
 class AdvancedQueryCache:
     """Phase 4: 高级查询结果缓存 - 10x性能提升目标"""
 
     def __init__(self, max_cache_entries: int = 200):
-        # 核心缓存数据 - 直接字典操作
-        self._query_cache: Dict[str, SearchResult] = {}
-        self._file_dependencies: Dict[str, Set[str]] = {}  # cache_key -> file_paths
+        # 核心缓存数据 - OrderedDict即LRU顺序，命中move_to_end
+        self._query_cache: "OrderedDict[QueryKey, SearchResult]" = OrderedDict()
+        self._file_dependencies: Dict[QueryKey, Set[str]] = {}  # key -> file_paths
         self._file_signatures: Dict[str, str] = {}  # file_path -> signature
-        self._access_times: Dict[str, float] = {}  # cache_key -> last_access
+        # key -> 缓存时的索引代数
+        self._validated: Dict[QueryKey, Tuple[int, int, int]] = {}
+        # 去掉limit的键 -> 已缓存的完整键，不同limit的同一查询互相复用
+        self._by_pattern: Dict[Tuple, Set[QueryKey]] = {}
 
         # 缓存统计 - 性能监控
         self._cache_hits = 0
@@ -32,38 +81,56 @@ class AdvancedQueryCache:
     def get_query_result(
         self, query: SearchQuery, index: CodeIndex
     ) -> Optional[SearchResult]:
-        """获取查询缓存结果 - 智能依赖检查"""
-        cache_key = self._generate_cache_key(query)
+        """获取查询缓存结果 - 同limit命中，或截取覆盖它的其他limit的结果"""
+        cache_key = _query_key(query)
 
         # 检查缓存是否存在
-        if cache_key not in self._query_cache:
-            self._cache_misses += 1
-            return None
+        if cache_key in self._query_cache:
+            result = self._valid_result(cache_key, index)
+            if result is not None:
+                self._cache_hits += 1
+                return result
+
+        limit = query.limit
+        for key in list(self._by_pattern.get(cache_key[:4], ())):
+            cached = self._query_cache[key]
+            if _covers(key[4], cached, limit) and self._valid_result(key, index):
+                self._cache_hits += 1
+                matches = cached.matches[:limit] if limit else cached.matches
+                return SearchResult(matches, len(matches), cached.search_time)
 
-        # 智能依赖验证 - 只检查相关文件
-        if self._is_cache_valid(cache_key, index):
-            self._cache_hits += 1
-            self._access_times[cache_key] = time.time()
+        self._cache_misses += 1
+        return None
+
+    def _valid_result(
+        self, cache_key: QueryKey, index: CodeIndex
+    ) -> Optional[SearchResult]:
+        """校验单个条目 - 索引代数未变且依赖文件签名未变才有效，失效即清理"""
+        fresh = self._validated[cache_key] == _index_generation(index)
+        if fresh and self._is_cache_valid(cache_key, index):
+            self._query_cache.move_to_end(cache_key)
             return self._query_cache[cache_key]
         else:
             # 缓存失效 - 清理
             self._invalidate_cache_entry(cache_key)
-            self._cache_misses += 1
             return None
 
     def cache_query_result(
         self, query: SearchQuery, result: SearchResult, index: CodeIndex
     ):
         """缓存查询结果 - 记录文件依赖"""
-        cache_key = self._generate_cache_key(query)
+        cache_key = _query_key(query)
 
         # LRU清理 - 保持缓存大小限制
-        if len(self._query_cache) >= self._max_entries:
-            self._evict_least_recently_used()
+        if cache_key not in self._query_cache:
+            if len(self._query_cache) >= self._max_entries:
+                self._evict_least_recently_used()
 
         # 缓存结果和依赖
         self._query_cache[cache_key] = result
-        self._access_times[cache_key] = time.time()
+        self._query_cache.move_to_end(cache_key)
+        self._validated[cache_key] = _index_generation(index)
+        self._by_pattern.setdefault(cache_key[:4], set()).add(cache_key)
 
         # 记录文件依赖 - 用于智能失效
         dependencies = self._extract_file_dependencies(query, result, index)
@@ -90,17 +157,9 @@ class AdvancedQueryCache:
 
     def _generate_cache_key(self, query: SearchQuery) -> str:
         """生成查询缓存键 - 精确查询指纹"""
-        query_data = {
-            "type": query.type,
-            "pattern": query.pattern,
-            "file_pattern": query.file_pattern,
-            "case_sensitive": query.case_sensitive,
-            "limit": query.limit,
-        }
-        query_str = "|".join(f"{k}:{v}" for k, v in sorted(query_data.items()))
-        return f"query_{hashlib.md5(query_str.encode()).hexdigest()}"
+        return _key_digest(_query_key(query))
 
-    def _is_cache_valid(self, cache_key: str, index: CodeIndex) -> bool:
+    def _is_cache_valid(self, cache_key: QueryKey, index: CodeIndex) -> bool:
         """检查缓存有效性 - 只验证依赖文件"""
         dependencies = self._file_dependencies.get(cache_key, set())
 
@@ -164,29 +223,24 @@ class AdvancedQueryCache:
         return dependencies
 
     def _matches_pattern(self, file_path: str, pattern: str) -> bool:
-        """文件模式匹配 - 简单glob支持"""
-        if "*" in pattern:
-            # 简单通配符支持
-            import fnmatch
-
-            return fnmatch.fnmatch(file_path, pattern)
-        return pattern in file_path
+        """文件模式匹配 - 与搜索的file_pattern过滤同一语义"""
+        return matches_file_pattern(file_path, pattern)
 
     def _evict_least_recently_used(self):
-        """LRU驱逐策略 - 清理最久未访问的缓存"""
-        if not self._access_times:
-            return
-
-        # 找到最久未访问的缓存键
-        oldest_key = min(self._access_times.keys(), key=lambda k: self._access_times[k])
-
-        self._invalidate_cache_entry(oldest_key)
+        """LRU驱逐策略 - 队首即最久未访问"""
+        if self._query_cache:
+            self._invalidate_cache_entry(next(iter(self._query_cache)))
 
-    def _invalidate_cache_entry(self, cache_key: str):
+    def _invalidate_cache_entry(self, cache_key: QueryKey):
         """失效单个缓存条目"""
         self._query_cache.pop(cache_key, None)
         self._file_dependencies.pop(cache_key, None)
-        self._access_times.pop(cache_key, None)
+        self._validated.pop(cache_key, None)
+        siblings = self._by_pattern.get(cache_key[:4])
+        if siblings is not None:
+            siblings.discard(cache_key)
+            if not siblings:
+                del self._by_pattern[cache_key[:4]]
 
         # 清理孤立的文件签名
         used_files = set()
@@ -234,7 +288,8 @@ class AdvancedQueryCache:
         self._query_cache.clear()
         self._file_dependencies.clear()
         self._file_signatures.clear()
-        self._access_times.clear()
+        self._validated.clear()
+        self._by_pattern.clear()
         self._cache_hits = 0
         self._cache_misses = 0
         self._invalidations = 0
@@ -253,10 +308,10 @@ class SearchCacheMixin:
 
     def get_cached_result(self, cache_key: str) -> Optional[SearchResult]:
         """获取缓存结果 - 使用高级缓存"""
-        # 通过cache_key重建query来使用新接口
+        # 内部键已是字段元组，这里按需算回md5字符串比对
         # 注意：这是为了向后兼容，理想情况下应该直接传递query对象
-        for query_cache_key, result in self._advanced_cache._query_cache.items():
-            if query_cache_key == cache_key:
+        for key, result in self._advanced_cache._query_cache.items():
+            if _key_digest(key) == cache_key:
                 return result
         return None
 
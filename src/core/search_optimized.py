@@ -9,21 +9,33 @@ Search Engine - Linus式性能优化版本
 
 import re
 import time
-from functools import lru_cache
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
 from .cache import get_file_cache
 from .index import CodeIndex, SearchQuery, SearchResult, SymbolInfo
-
-
-@lru_cache(maxsize=500)
-def _compile_regex_cached(pattern: str, case_sensitive: bool) -> Optional[re.Pattern]:
-    """模块级正则缓存 - 避免实例方法内存泄漏"""
-    try:
-        flags = 0 if case_sensitive else re.IGNORECASE
-        return re.compile(pattern, flags)
-    except re.error:
-        return None
+from .search_parallel import (
+    compile_regex_cached,
+    iter_matching_lines,
+    iter_regex_lines,
+)
+
+
+def _iter_hit_lines(
+    lines: List[str], text: Optional[str], pattern: str, case_sensitive: bool
+) -> Iterator[int]:
+    """命中行号(0基) - 在行的拼接文本上str.find，只有命中行进入解释器
+
+    text为按大小写规则处理过的拼接文本；为None(行内含换行)时退回逐行判断。
+    """
+    if not lines:
+        return iter(())
+    if text is None:
+        return (
+            line_idx
+            for line_idx, line in enumerate(lines)
+            if pattern in (line if case_sensitive else line.lower())
+        )
+    return iter_matching_lines(text, pattern, lines if case_sensitive else None)
 
 
 class OptimizedSearchEngine:
@@ -33,12 +45,8 @@ class OptimizedSearchEngine:
         self.index = index
         self.file_cache = get_file_cache()  # 使用全局优化缓存
 
-    def search(self, query: SearchQuery) -> SearchResult:
-        """统一搜索分派 - 零分支"""
-        start_time = time.time()
-
-        # 优化的操作注册表 - 按plans.md要求完整实现
-        search_ops = {
+        # 优化的操作注册表 - 按plans.md要求完整实现，构造时绑定一次
+        self._search_ops: Dict[str, Callable[[SearchQuery], List[Any]]] = {
             "text": self._search_text_optimized,
             "regex": self._search_regex_optimized,
             "symbol": self._search_symbol_direct,
@@ -50,10 +58,12 @@ class OptimizedSearchEngine:
             "hierarchy": self._find_hierarchy_direct,
         }
 
-        search_method: Callable[[SearchQuery], List[Any]] = search_ops.get(
-            query.type, lambda q: []
-        )
-        matches = search_method(query)
+    def search(self, query: SearchQuery) -> SearchResult:
+        """统一搜索分派 - 零分支"""
+        start_time = time.time()
+
+        search_method = self._search_ops.get(query.type)
+        matches = search_method(query) if search_method is not None else []
 
         return SearchResult(
             matches=matches,
@@ -67,7 +77,7 @@ class OptimizedSearchEngine:
 
     def _get_regex(self, pattern: str, case_sensitive: bool) -> Optional[re.Pattern]:
         """获取正则表达式 - 使用模块级缓存"""
-        return _compile_regex_cached(pattern, case_sensitive)
+        return compile_regex_cached(pattern, case_sensitive)
 
     def _search_text_optimized(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """优化文本搜索 - 预处理 + 早期终止"""
@@ -81,22 +91,24 @@ class OptimizedSearchEngine:
             ):
                 continue
 
-            lines = self._get_file_lines(file_path)
-            for line_num, line in enumerate(lines, 1):
-                search_line = line.lower() if not query.case_sensitive else line
-                if pattern in search_line:
-                    matches.append(
-                        {
-                            "file": file_path,
-                            "line": line_num,
-                            "content": line.strip(),
-                            "language": file_info.language,
-                        }
-                    )
+            lines, text = self.file_cache.get_file_text(
+                file_path, not query.case_sensitive
+            )
+            for line_idx in _iter_hit_lines(
+                lines, text, pattern, query.case_sensitive
+            ):
+                matches.append(
+                    {
+                        "file": file_path,
+                        "line": line_idx + 1,
+                        "content": lines[line_idx].strip(),
+                        "language": file_info.language,
+                    }
+                )
         return matches
 
     def _search_regex_optimized(self, query: SearchQuery) -> List[Dict[str, Any]]:
-        """优化正则搜索 - 缓存编译结果"""
+        """优化正则搜索 - 缓存编译结果，必含字面量先整段筛选候选行"""
         regex = self._get_regex(query.pattern, query.case_sensitive)
         if not regex:
             return []
@@ -108,17 +120,16 @@ class OptimizedSearchEngine:
             ):
                 continue
 
-            lines = self._get_file_lines(file_path)
-            for line_num, line in enumerate(lines, 1):
-                if regex.search(line):
-                    matches.append(
-                        {
-                            "file": file_path,
-                            "line": line_num,
-                            "content": line.strip(),
-                            "language": file_info.language,
-                        }
-                    )
+            lines, text = self.file_cache.get_file_text(file_path)
+            for line_idx in iter_regex_lines(regex, lines, text):
+                matches.append(
+                    {
+                        "file": file_path,
+                        "line": line_idx + 1,
+                        "content": lines[line_idx].strip(),
+                        "language": file_info.language,
+                    }
+                )
         return matches
 
     def _search_symbol_direct(self, query: SearchQuery) -> List[Dict[str, Any]]:
@@ -126,20 +137,26 @@ class OptimizedSearchEngine:
         pattern = query.pattern.lower() if not query.case_sensitive else query.pattern
         matches = []
 
-        for symbol_name, symbol_info in self.index.symbols.items():
-            search_name = (
-                symbol_name.lower() if not query.case_sensitive else symbol_name
+        symbols = self.index.symbols
+        if query.case_sensitive:
+            names: Iterable[str] = (name for name in symbols if pattern in name)
+        else:
+            names = (
+                name
+                for name, lower in self.index.lowercase_symbol_names()
+                if pattern in lower
+            )
+        for symbol_name in names:
+            # Direct access to SymbolInfo object attributes
+            symbol_info = symbols[symbol_name]
+            matches.append(
+                {
+                    "symbol": symbol_name,
+                    "type": symbol_info.type,
+                    "file": symbol_info.file,
+                    "line": symbol_info.line,
+                }
             )
-            if pattern in search_name:
-                # Direct access to SymbolInfo object attributes
-                matches.append(
-                    {
-                        "symbol": symbol_name,
-                        "type": symbol_info.type,
-                        "file": symbol_info.file,
-                        "line": symbol_info.line,
-                    }
-                )
         return matches
 
     def _find_references_direct(self, query: SearchQuery) -> List[Dict[str, Any]]:
@@ -186,11 +203,11 @@ class OptimizedSearchEngine:
     def clear_cache(self):
         """清理缓存 - 内存管理"""
         self.file_cache.clear_cache()
-        _compile_regex_cached.cache_clear()  # 清理模块级LRU缓存
+        compile_regex_cached.cache_clear()  # 清理模块级LRU缓存
 
     def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
-        regex_info = _compile_regex_cached.cache_info()
+        regex_info = compile_regex_cached.cache_info()
         return {
             "file_cache": self.file_cache.get_cache_stats(),
             "regex_cache": {
@@ -4,12 +4,255 @@ Parallel Search Engine - Phase 3并行搜索模块
 Linus风格拆分 - 专注并行搜索逻辑
 """
 
-from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from itertools import compress
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .index import CodeIndex, SearchQuery
 
+# re的私有解析器只用于必含字面量预筛，两处都导入失败时关闭预筛而不是让搜索不可用
+try:
+    from re import _constants as _sre_constants
+    from re import _parser as _sre_parse
+
+    _SRE_PARSER_AVAILABLE = True
+except ImportError:  # Python 3.10
+    try:
+        import sre_constants as _sre_constants  # type: ignore[no-redef]
+        import sre_parse as _sre_parse  # type: ignore[no-redef]
+
+        _SRE_PARSER_AVAILABLE = True
+    except ImportError:
+        _SRE_PARSER_AVAILABLE = False
+
+# 搜索文件缓存: 绝对路径 -> [mtime_ns, size, cost, lines, text, lowered]，文本/正则/并行搜索共享
+# text是解码后的原文，lines(text按"\n"切分)与lowered都按需生成；cost为计入字节预算的大小
+# 多数文件在一次查询中没有命中，只缓存整段文本，取命中行时才切分
+# 并行块在多个线程中读取，缓存结构的修改都在锁内进行
+_LINE_CACHE_MAX_ENTRIES = 4096
+_LINE_CACHE_MAX_BYTES = 256 << 20
+_line_cache: "OrderedDict[str, List[Any]]" = OrderedDict()
+_line_cache_bytes = 0
+_line_cache_lock = threading.Lock()
+
+# 并行搜索: 固定小块按提交顺序收集，够数后取消尚未开始的块
+# 匹配本身持有GIL，线程只在读盘解码时重叠，所以只对冷文件足够多的查询并行
+_PARALLEL_CHUNK_FILES = 16
+_PARALLEL_MIN_COLD_FILES = 50
+
+# 超大文件(日志、压缩后的JS)不进缓存: 按行对齐分块流式扫描，内存只占一块
+# 整文件缓存会挤掉其余所有文件，超过内存的文件更是无法整段解码
+_STREAM_MIN_BYTES = 32 << 20
+_STREAM_BLOCK_CHARS = 1 << 20
+
+# 命中密度阈值: 已扫描部分平均每_DENSE_LINES_PER_HIT行内有一次命中即视为密集
+_DENSE_MIN_HITS = 8
+_DENSE_LINES_PER_HIT = 8
+
+
+def _cached_entry(full_path: str) -> List[Any]:
+    """取缓存项 - (mtime_ns, size)未变时直接复用，否则重新读取解码"""
+    global _line_cache_bytes
+    st = os.stat(full_path)
+    with _line_cache_lock:
+        entry = _line_cache.get(full_path)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            _line_cache.move_to_end(full_path)
+            return entry
+
+    text = Path(full_path).read_text(encoding="utf-8", errors="ignore")
+    entry = [st.st_mtime_ns, st.st_size, st.st_size, None, text, None]
+
+    with _line_cache_lock:
+        previous = _line_cache.pop(full_path, None)
+        if previous is not None:
+            _line_cache_bytes -= previous[2]
+        _line_cache[full_path] = entry
+        _line_cache_bytes += entry[2]
+        while len(_line_cache) > _LINE_CACHE_MAX_ENTRIES or (
+            _line_cache_bytes > _LINE_CACHE_MAX_BYTES and len(_line_cache) > 1
+        ):
+            _line_cache_bytes -= _line_cache.popitem(last=False)[1][2]
+    return entry
+
+
+def _fill_entry(
+    full_path: str, entry: List[Any], slot: int, value: Any, cost: int
+) -> Any:
+    """惰性字段写回缓存项 - 并发时以先写入者为准，大小计入字节预算"""
+    global _line_cache_bytes
+    with _line_cache_lock:
+        if entry[slot] is None:
+            entry[slot] = value
+            entry[2] += cost
+            if _line_cache.get(full_path) is entry:
+                _line_cache_bytes += cost
+        return entry[slot]
+
+
+def entry_lines(full_path: str, entry: List[Any]) -> List[str]:
+    """缓存项的行列表 - 首次需要时切分，之后随缓存项复用"""
+    lines = entry[3]
+    if lines is None:
+        lines = _fill_entry(full_path, entry, 3, entry[4].split("\n"), entry[1])
+    return lines
+
+
+def read_entry_cached(full_path: str, lower: bool = False) -> Tuple[List[Any], str]:
+    """读取缓存项及整段文本 - lower时返回小写文本，惰性生成后随缓存项复用
+
+    行列表通过entry_lines()按需获取，保证与文本来自同一缓存项。
+    """
+    entry = _cached_entry(full_path)
+    if not lower:
+        return entry, entry[4]
+    lowered = entry[5]
+    if lowered is None:
+        # 大小写转换不会增删换行，整段小写与逐行小写的行号一一对应
+        lowered = entry[4].lower()
+        lowered = _fill_entry(full_path, entry, 5, lowered, len(lowered))
+    return entry, lowered
+
+
+def iter_file_blocks(
+    full_path: str, block_chars: int = _STREAM_BLOCK_CHARS
+) -> Iterator[Tuple[int, str]]:
+    """按行对齐分块读取 - 产出(块首行号0基, 块文本)
+
+    解码方式与缓存读取一致(utf-8忽略坏字节、通用换行)，块文本不含结尾换行，
+    所有块以"\n"相连即整段文本；超长行跨多次读取时先攒片段再拼接。
+    """
+    with open(full_path, encoding="utf-8", errors="ignore") as f:
+        line_no = 0
+        pieces: List[str] = []
+        while True:
+            chunk = f.read(block_chars)
+            if not chunk:
+                break
+            cut = chunk.rfind("\n")
+            if cut == -1:
+                pieces.append(chunk)
+                continue
+            pieces.append(chunk[:cut])
+            block = "".join(pieces)
+            pieces = [chunk[cut + 1 :]]
+            yield line_no, block
+            line_no += block.count("\n") + 1
+        yield line_no, "".join(pieces)
+
+
+def iter_matching_lines(
+    text: str, pattern: str, lines: Optional[List[str]] = None
+) -> Iterator[int]:
+    """整段文本find扫描 - 产出包含pattern的行号(0基)，每行至多一次
+
+    命中后直接跳到下一行继续find，行号只对跳过的区间count换行，
+    等价于逐行`pattern in line`。命中密集时逐次find的解释器开销反超逐行
+    判断，此时剩余部分改为逐行包含测试；lines为text切分好的行列表(可选)。
+    """
+    if "\n" in pattern:
+        return  # 单行内不可能包含换行
+    line_no = 0
+    counted = 0
+    hits = 0
+    pos = text.find(pattern)
+    while pos != -1:
+        line_no += text.count("\n", counted, pos)
+        yield line_no
+        line_end = text.find("\n", pos)
+        if line_end == -1:
+            return
+        line_no += 1
+        counted = line_end + 1
+        hits += 1
+        if hits >= _DENSE_MIN_HITS and hits * _DENSE_LINES_PER_HIT > line_no:
+            rest = lines[line_no:] if lines is not None else text[counted:].split("\n")
+            for rest_no, line in enumerate(rest, line_no):
+                if pattern in line:
+                    yield rest_no
+            return
+        pos = text.find(pattern, counted)
+
+
+def iter_regex_lines(
+    regex: "re.Pattern[str]", lines: List[str], text: Optional[str] = None
+) -> Iterator[int]:
+    """正则命中行号(0基) - 语义与逐行regex.search一致
+
+    有必含字面量且给出整段文本(lines按"\n"拼接)时先find筛候选行；
+    否则map+compress让逐行search在C层迭代，只有命中行回到解释器。
+    """
+    literal = required_literal(regex.pattern, regex.flags) if text is not None else ""
+    if literal and text is not None:
+        search = regex.search
+        return (
+            line_idx
+            for line_idx in iter_matching_lines(text, literal, lines)
+            if search(lines[line_idx])
+        )
+    return compress(range(len(lines)), map(regex.search, lines))
+
+
+@lru_cache(maxsize=500)
+def compile_regex_cached(pattern: str, case_sensitive: bool) -> Optional[re.Pattern]:
+    """模块级正则缓存 - 两个引擎共用；非法模式也缓存为None，不再每次重新解析报错"""
+    try:
+        flags = 0 if case_sensitive else re.IGNORECASE
+        return re.compile(pattern, flags)
+    except re.error:
+        return None
+
+
+def matches_file_pattern(file_path: str, pattern: str) -> bool:
+    """file_pattern过滤 - 与rg --glob同一语义，fallback与rg扫描同一批文件
+
+    不含"/"的模式匹配文件名(任意目录下)，含"/"的匹配相对路径，
+    "**/"前缀也匹配顶层，"!"前缀取反；与rg一样区分大小写。
+    """
+    if pattern.startswith("!"):
+        return not matches_file_pattern(file_path, pattern[1:])
+    path = file_path.replace(os.sep, "/")
+    if "/" not in pattern:
+        return fnmatchcase(path.rpartition("/")[2], pattern)
+    pattern = pattern.lstrip("/")
+    if pattern.startswith("**/") and fnmatchcase(path, pattern[3:]):
+        return True
+    return fnmatchcase(path, pattern)
+
+
+@lru_cache(maxsize=256)
+def required_literal(pattern: str, flags: int = 0) -> str:
+    """正则的必含字面量 - 顶层连续LITERAL中最长的一段，无法确定时返回空串
+
+    顶层序列每一项都必须参与匹配，所以任何匹配行都包含这段子串，
+    可以先整段find筛出候选行再跑正则。忽略大小写时re的等价关系
+    与str.lower不完全一致(如ſ/s、K/k)，直接放弃。
+    """
+    if flags & re.IGNORECASE or not _SRE_PARSER_AVAILABLE:
+        return ""
+    try:
+        parsed = _sre_parse.parse(pattern, flags)
+    except Exception:
+        return ""
+    if parsed.state.flags & re.IGNORECASE:
+        return ""
+    best = run = ""
+    for op, value in parsed:
+        if op == _sre_constants.LITERAL:
+            run += chr(value)
+            if len(run) > len(best):
+                best = run
+        else:
+            run = ""
+    return best
+
 
 class ParallelSearchMixin:
     """并行搜索混入 - Linus风格模块化"""
@@ -17,7 +260,7 @@ class ParallelSearchMixin:
     def __init__(self, index: CodeIndex):
         self.index = index
         self._thread_pool: Optional[ThreadPoolExecutor] = None
-        self._optimal_workers = min(4, max(1, len(index.files) // 10))
+        self._optimal_workers = min(32, (os.cpu_count() or 1) * 2)
 
     @property
     def thread_pool(self):
@@ -27,126 +270,179 @@ class ParallelSearchMixin:
         return self._thread_pool
 
     def _should_use_parallel(self, file_count: int) -> bool:
-        """判断是否使用并行 - 简单阈值"""
-        return file_count >= 50
+        """判断是否使用并行 - 需要读盘的文件足够多时才值得，热缓存直接单线程"""
+        if file_count < _PARALLEL_MIN_COLD_FILES:
+            return False
+        base_path = self.index.base_path
+        cold = 0
+        for file_path in self.index.files:
+            if os.path.join(base_path, file_path) not in _line_cache:
+                cold += 1
+                if cold >= _PARALLEL_MIN_COLD_FILES:
+                    return True
+        return False
+
+    def _query_files(self, query: SearchQuery) -> Iterable[Tuple[str, Any]]:
+        """查询范围内的(文件, 文件信息) - 按file_pattern过滤，保持索引顺序"""
+        if not query.file_pattern:
+            return self.index.files.items()
+        pattern = query.file_pattern
+        return [
+            item
+            for item in self.index.files.items()
+            if matches_file_pattern(item[0], pattern)
+        ]
+
+    def _file_chunks(self, query: SearchQuery) -> List[List[Tuple[str, Any]]]:
+        """文件切成固定小块 - 块小则取消及时、浪费有界"""
+        file_items = list(self._query_files(query))
+        return [
+            file_items[i : i + _PARALLEL_CHUNK_FILES]
+            for i in range(0, len(file_items), _PARALLEL_CHUNK_FILES)
+        ]
+
+    def _collect_in_order(
+        self,
+        futures: List[Future],
+        limit: Optional[int],
+        stop: Optional[threading.Event] = None,
+    ) -> List[Dict[str, Any]]:
+        """按提交顺序收集块结果 - 与单线程结果一致
+
+        够数后取消未开始的块，并通过stop通知已在运行的块在文件间隙退出；
+        它们位于截断点之后，结果本就会被丢弃。
+        """
+        matches: List[Dict[str, Any]] = []
+        try:
+            for position, future in enumerate(futures):
+                matches.extend(future.result())
+                if limit and len(matches) >= limit:
+                    for pending in futures[position + 1 :]:
+                        pending.cancel()
+                    return matches[:limit]
+            return matches
+        finally:
+            if stop is not None:
+                stop.set()
+
+    def _iter_text_hits(
+        self, file_path: str, pattern: str, case_sensitive: bool
+    ) -> Iterator[Tuple[int, str]]:
+        """文本命中行 - 产出(行号, 原始行)；pattern需已按大小写规则处理"""
+        full_path = os.path.join(self.index.base_path, file_path)
+        try:
+            if os.path.getsize(full_path) >= _STREAM_MIN_BYTES:
+                for first_line, block in iter_file_blocks(full_path):
+                    haystack = block if case_sensitive else block.lower()
+                    block_lines = None
+                    for line_idx in iter_matching_lines(haystack, pattern):
+                        if block_lines is None:
+                            block_lines = block.split("\n")
+                        yield first_line + line_idx + 1, block_lines[line_idx]
+                return
+            entry, text = read_entry_cached(full_path, not case_sensitive)
+        except Exception:
+            return
+        lines = entry[3]
+        for line_idx in iter_matching_lines(
+            text, pattern, lines if case_sensitive else None
+        ):
+            if lines is None:
+                lines = entry_lines(full_path, entry)
+            yield line_idx + 1, lines[line_idx]
 
-    def _read_file_lines(self, file_path: str) -> List[str]:
-        """读取文件行 - 复用逻辑"""
+    def _iter_regex_hits(self, file_path: str, regex) -> Iterator[Tuple[int, str]]:
+        """正则命中行 - 有必含字面量时先整段find筛候选行，只对候选行跑正则"""
+        full_path = os.path.join(self.index.base_path, file_path)
+        literal = required_literal(regex.pattern, regex.flags)
         try:
-            return (
-                (Path(self.index.base_path) / file_path)
-                .read_text(encoding="utf-8", errors="ignore")
-                .split("\n")
-            )
+            if os.path.getsize(full_path) >= _STREAM_MIN_BYTES:
+                for first_line, block in iter_file_blocks(full_path):
+                    if literal and literal not in block:
+                        continue
+                    block_lines = block.split("\n")
+                    for line_idx in iter_regex_lines(regex, block_lines, block):
+                        yield first_line + line_idx + 1, block_lines[line_idx]
+                return
+            entry, text = read_entry_cached(full_path)
         except Exception:
-            return []
+            return
+        if literal and literal not in text:
+            return  # 不可能命中，无需切分行
+        lines = entry_lines(full_path, entry)
+        for line_idx in iter_regex_lines(regex, lines, text):
+            yield line_idx + 1, lines[line_idx]
 
     def search_text_parallel(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """并行文本搜索"""
-        file_items = list(self.index.files.items())
-        chunk_size = max(1, len(file_items) // self._optimal_workers)
-        file_chunks = [
-            file_items[i : i + chunk_size]
-            for i in range(0, len(file_items), chunk_size)
+        stop = threading.Event()
+        futures = [
+            self.thread_pool.submit(self._search_text_chunk, query, chunk, stop)
+            for chunk in self._file_chunks(query)
         ]
-
-        # 并行处理
-        futures = []
-        for chunk in file_chunks:
-            future = self.thread_pool.submit(self._search_text_chunk, query, chunk)
-            futures.append(future)
-
-        # 收集结果
-        matches = []
-        for future in futures:
-            chunk_matches = future.result()
-            matches.extend(chunk_matches)
-            # 早期退出
-            if query.limit and len(matches) >= query.limit:
-                matches = matches[: query.limit]
-                break
-
-        return matches
+        return self._collect_in_order(futures, query.limit, stop)
 
     def _search_text_chunk(
-        self, query: SearchQuery, file_chunk: List
+        self,
+        query: SearchQuery,
+        file_chunk: List,
+        stop: Optional[threading.Event] = None,
     ) -> List[Dict[str, Any]]:
-        """文本搜索文件块"""
+        """文本搜索文件块 - stop置位后在文件间隙退出"""
         pattern = query.pattern.lower() if not query.case_sensitive else query.pattern
         matches = []
         for file_path, file_info in file_chunk:
-            lines = self._read_file_lines(file_path)
-            for line_num, line in enumerate(lines, 1):
-                search_line = line.lower() if not query.case_sensitive else line
-                if pattern in search_line:
-                    matches.append(
-                        {
-                            "file": file_path,
-                            "line": line_num,
-                            "content": line.strip(),
-                            "language": file_info.language,
-                        }
-                    )
-                    # 块级早期退出
-                    if (
-                        query.limit
-                        and len(matches) >= query.limit // self._optimal_workers
-                    ):
-                        return matches
+            if stop is not None and stop.is_set():
+                break
+            for line_num, line in self._iter_text_hits(
+                file_path, pattern, query.case_sensitive
+            ):
+                matches.append(
+                    {
+                        "file": file_path,
+                        "line": line_num,
+                        "content": line.strip(),
+                        "language": file_info.language,
+                    }
+                )
+                # 块级早期退出: 单块最多贡献limit条
+                if query.limit and len(matches) >= query.limit:
+                    return matches
         return matches
 
     def search_regex_parallel(self, query: SearchQuery, regex) -> List[Dict[str, Any]]:
         """并行正则搜索"""
-        file_items = list(self.index.files.items())
-        chunk_size = max(1, len(file_items) // self._optimal_workers)
-        file_chunks = [
-            file_items[i : i + chunk_size]
-            for i in range(0, len(file_items), chunk_size)
+        stop = threading.Event()
+        futures = [
+            self.thread_pool.submit(self._search_regex_chunk, query, regex, chunk, stop)
+            for chunk in self._file_chunks(query)
         ]
-
-        # 并行处理
-        futures = []
-        for chunk in file_chunks:
-            future = self.thread_pool.submit(
-                self._search_regex_chunk, query, regex, chunk
-            )
-            futures.append(future)
-
-        # 收集结果
-        matches = []
-        for future in futures:
-            chunk_matches = future.result()
-            matches.extend(chunk_matches)
-            # 早期退出
-            if query.limit and len(matches) >= query.limit:
-                matches = matches[: query.limit]
-                break
-
-        return matches
+        return self._collect_in_order(futures, query.limit, stop)
 
     def _search_regex_chunk(
-        self, query: SearchQuery, regex, file_chunk: List
+        self,
+        query: SearchQuery,
+        regex,
+        file_chunk: List,
+        stop: Optional[threading.Event] = None,
     ) -> List[Dict[str, Any]]:
-        """正则搜索文件块"""
+        """正则搜索文件块 - stop置位后在文件间隙退出"""
         matches = []
         for file_path, file_info in file_chunk:
-            lines = self._read_file_lines(file_path)
-            for line_num, line in enumerate(lines, 1):
-                if regex.search(line):
-                    matches.append(
-                        {
-                            "file": file_path,
-                            "line": line_num,
-                            "content": line.strip(),
-                            "language": file_info.language,
-                        }
-                    )
-                    # 块级早期退出
-                    if (
-                        query.limit
-                        and len(matches) >= query.limit // self._optimal_workers
-                    ):
-                        return matches
+            if stop is not None and stop.is_set():
+                break
+            for line_num, line in self._iter_regex_hits(file_path, regex):
+                matches.append(
+                    {
+                        "file": file_path,
+                        "line": line_num,
+                        "content": line.strip(),
+                        "language": file_info.language,
+                    }
+                )
+                # 块级早期退出: 单块最多贡献limit条
+                if query.limit and len(matches) >= query.limit:
+                    return matches
         return matches
 
     def __del__(self):
@@ -4,9 +4,67 @@ Semantic Operations - 语义搜索操作
 从search_optimized.py拆分，保持文件<200行
 """
 
-from typing import Any, Dict, List
-
-from .index import CodeIndex, SearchQuery
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+from .index import CodeIndex, SearchQuery, SymbolInfo
+
+
+def definition_matches(
+    symbol_name: str, symbol_info: SymbolInfo
+) -> List[Dict[str, Any]]:
+    """定义结果 - 符号自身位置"""
+    return [
+        {
+            "file": symbol_info.file,
+            "line": symbol_info.line,
+            "type": "definition",
+            "symbol": symbol_name,
+        }
+    ]
+
+
+def reference_matches(
+    symbol_name: str, symbol_info: SymbolInfo, limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """引用结果 - 解析"file:line"形式的引用记录，给定limit时只解析前limit条"""
+    matches = (
+        {
+            "file": file_part,
+            "line": int(rest.partition(":")[0]),
+            "type": "reference",
+            "symbol": symbol_name,
+        }
+        for file_part, sep, rest in (
+            ref.partition(":") for ref in symbol_info.references
+        )
+        if sep
+    )
+    return list(islice(matches, limit)) if limit else list(matches)
+
+
+def caller_matches(
+    symbols: Dict[str, SymbolInfo],
+    symbol_info: SymbolInfo,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """调用者结果 - 只保留仍在索引中的调用者，给定limit时取够即停"""
+    get_symbol = symbols.get
+    matches = []
+    for caller in symbol_info.called_by:
+        caller_info = get_symbol(caller)
+        if caller_info:
+            matches.append(
+                {
+                    "symbol": caller,
+                    "file": caller_info.file,
+                    "line": caller_info.line,
+                    "type": "caller",
+                }
+            )
+            if limit and len(matches) >= limit:
+                break
+    return matches
 
 
 class SemanticOperations:
@@ -20,57 +78,19 @@ class SemanticOperations:
         symbol_info = self.index.symbols.get(query.pattern)
         if not symbol_info:
             return []
-
-        matches = []
-        for ref in symbol_info.references:
-            if ":" in ref:
-                parts = ref.split(":")
-                if len(parts) >= 2:
-                    matches.append(
-                        {
-                            "file": parts[0],
-                            "line": int(parts[1]),
-                            "type": "reference",
-                            "symbol": query.pattern,
-                        }
-                    )
-        return matches
+        return reference_matches(query.pattern, symbol_info, query.limit)
 
     def find_definition_direct(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """定义查找 - 直接索引访问"""
         symbol_info = self.index.symbols.get(query.pattern)
-        return (
-            [
-                {
-                    "file": symbol_info.file,
-                    "line": symbol_info.line,
-                    "type": "definition",
-                    "symbol": query.pattern,
-                }
-            ]
-            if symbol_info
-            else []
-        )
+        return definition_matches(query.pattern, symbol_info) if symbol_info else []
 
     def find_callers_direct(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """调用者查找 - 直接关系访问"""
         symbol_info = self.index.symbols.get(query.pattern)
         if not symbol_info:
             return []
-
-        matches = []
-        for caller in symbol_info.called_by:
-            caller_info = self.index.symbols.get(caller)
-            if caller_info:
-                matches.append(
-                    {
-                        "symbol": caller,
-                        "file": caller_info.file,
-                        "line": caller_info.line,
-                        "type": "caller",
-                    }
-                )
-        return matches
+        return caller_matches(self.index.symbols, symbol_info, query.limit)
 
     def find_implementations_direct(self, query: SearchQuery) -> List[Dict[str, Any]]:
         """查找实现 - 直接索引访问"""
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+索引数据结构测试 - CodeIndex反向索引、文件缓存与目录树指纹
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core.cache import OptimizedFileCache
+from core.incremental import IncrementalIndexer, compute_tree_fingerprint
+from core.index import CodeIndex, FileInfo, SymbolInfo
+
+
+class TestTreeFingerprint:
+    """目录树指纹测试 - 刷新工具的短路依据"""
+
+    @pytest.mark.unit
+    def test_fingerprint_stable_and_change_sensitive(self, tmp_path):
+        """无变更时指纹稳定，内容或文件增删时指纹变化"""
+        source = tmp_path / "main.py"
+        source.write_text("def main():\n    pass\n")
+        (tmp_path / "notes.txt").write_text("ignored")
+
+        first = compute_tree_fingerprint(str(tmp_path), {".py"})
+        assert compute_tree_fingerprint(str(tmp_path), {".py"}) == first
+
+        (tmp_path / "notes.txt").write_text("still ignored")
+        assert compute_tree_fingerprint(str(tmp_path), {".py"}) == first
+
+        source.write_text("def main():\n    return 1\n")
+        second = compute_tree_fingerprint(str(tmp_path), {".py"})
+        assert second != first
+
+        (tmp_path / "utils.py").write_text("")
+        assert compute_tree_fingerprint(str(tmp_path), {".py"}) != second
+
+
+class TestLowercaseNames:
+    """符号名小写缓存测试"""
+
+    @pytest.mark.unit
+    def test_rebuilt_on_same_size_replacement(self):
+        """删一个加一个、符号数不变时也应重建"""
+        index = CodeIndex(base_path="/tmp", files={}, symbols={})
+        index.add_symbol("Alpha", SymbolInfo(type="class", file="a.py", line=1))
+        index.add_symbol("Beta", SymbolInfo(type="class", file="b.py", line=1))
+        assert ("Beta", "beta") in index.lowercase_symbol_names()
+
+        index.remove_file_symbols("b.py")
+        index.add_symbol("Gamma", SymbolInfo(type="class", file="b.py", line=1))
+        names = index.lowercase_symbol_names()
+        assert names == [("Alpha", "alpha"), ("Gamma", "gamma")]
+
+
+class TestFileTextCache:
+    """文件拼接文本缓存测试"""
+
+    @pytest.mark.unit
+    def test_text_follows_reloaded_lines(self, tmp_path):
+        """拼接文本随行缓存重新加载，小写文本惰性生成"""
+        source = tmp_path / "main.py"
+        source.write_text("Foo\nbar\n")
+        cache = OptimizedFileCache(max_size=10, max_memory_mb=1)
+
+        lines, text = cache.get_file_text(str(source))
+        assert text == "\n".join(lines) == "Foo\nbar"
+        assert cache.get_file_text(str(source), lower=True)[1] == "foo\nbar"
+
+        source.write_text("Baz\n")
+        assert cache.get_file_text(str(source), lower=True) == (["Baz"], "baz")
+
+
+class TestSymbolsByFile:
+    """文件->符号反向索引测试"""
+
+    @pytest.mark.unit
+    def test_reverse_index_tracks_add_move_and_remove(self, tmp_path):
+        """符号新增、跨文件覆盖、文件移除时反向索引保持一致"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        index.add_symbol("main", SymbolInfo(type="function", file="a.py", line=1))
+        index.add_symbol("helper", SymbolInfo(type="function", file="a.py", line=5))
+        assert list(index.get_file_symbols("a.py")) == ["main", "helper"]
+
+        index.add_symbol("helper", SymbolInfo(type="function", file="b.py", line=2))
+        assert list(index.get_file_symbols("a.py")) == ["main"]
+        assert list(index.get_file_symbols("b.py")) == ["helper"]
+
+        index.remove_file("a.py")
+        assert "main" not in index.symbols
+        assert index.get_file_symbols("a.py") == {}
+        assert "helper" in index.symbols
+
+    @pytest.mark.unit
+    def test_lowercase_names_follow_symbol_changes(self, tmp_path):
+        """小写符号名缓存随符号名增删重建，同名覆盖时复用"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        index.add_symbol("Main", SymbolInfo(type="function", file="a.py", line=1))
+        names = index.lowercase_symbol_names()
+        assert names == [("Main", "main")]
+
+        index.add_symbol("Main", SymbolInfo(type="function", file="a.py", line=3))
+        assert index.lowercase_symbol_names() is names
+
+        index.remove_file("a.py")
+        index.add_symbol("Other", SymbolInfo(type="class", file="b.py", line=1))
+        assert index.lowercase_symbol_names() == [("Other", "other")]
+
+
+class TestIncrementalRemove:
+    """增量移除测试"""
+
+    @pytest.mark.unit
+    def test_removing_symbolless_file_bumps_generation(self, tmp_path):
+        """无符号的文件被删除时也要让依赖索引代数的缓存失效"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        index.add_file("empty.py", FileInfo("python", 0, {}, []))
+        generation = index._generation
+
+        IncrementalIndexer(index)._remove_file("empty.py")
+        assert "empty.py" not in index.files
+        assert index._generation > generation
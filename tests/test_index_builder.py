@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+索引构建测试 - 正则回退解析
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core.builder_core import IndexBuilder
+from core.index import CodeIndex
+
+
+class TestVlangRegexBuilder:
+    """V语言正则构建测试"""
+
+    @pytest.mark.unit
+    def test_definitions_and_imports(self, tmp_path):
+        """含"::"的行才进正则，导入行不受预筛影响"""
+        source = tmp_path / "m.v"
+        lines = ["import os", "main :: () {", "}", "Point :: struct {", "}"]
+        lines.append("x := a::b")
+        source.write_text("\n".join(lines) + "\n")
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        IndexBuilder(index)._process_vlang_regex(str(source))
+        found = {name: (info.type, info.line) for name, info in index.symbols.items()}
+        assert found == {
+            "main": ("function", 2),
+            "Point": ("type", 4),
+            "os": ("import", 1),
+        }
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+MCP工具内部辅助函数测试 - 验证性能优化不改变行为
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core import mcp_tools
+from core.index import FileInfo, set_project_path
+from core.mcp_tools import (
+    _detect_brace_body_end_improved,
+    _invalidate_file_cache,
+    _organize_imports_impl,
+    _read_file_cached,
+    _read_line_window,
+    _resolve_file_path,
+    tool_find_scip_symbol,
+    tool_process_file_with_scip,
+    tool_refresh_index,
+)
+
+
+class TestResolveFilePath:
+    """路径解析测试"""
+
+    @pytest.mark.unit
+    def test_relative_path_joined_with_base(self, tmp_path):
+        """相对路径应相对于base_path解析"""
+        result = _resolve_file_path(str(tmp_path), "src/main.py")
+        assert result == tmp_path / "src" / "main.py"
+
+    @pytest.mark.unit
+    def test_absolute_path_returned_unchanged(self, tmp_path):
+        """绝对路径应直接返回"""
+        absolute = str(tmp_path / "other.py")
+        assert _resolve_file_path("/some/base", absolute) == Path(absolute)
+
+    @pytest.mark.unit
+    def test_missing_base_path(self):
+        """无base_path时直接返回文件路径"""
+        assert _resolve_file_path(None, "main.py") == Path("main.py")
+        assert _resolve_file_path("", "main.py") == Path("main.py")
+
+
+class TestOrganizeImports:
+    """导入整理测试"""
+
+    @pytest.mark.unit
+    def test_unsorted_imports_deduplicated_and_sorted(self):
+        """无序且重复的导入应去重排序"""
+        result = _organize_imports_impl(("sys", "os", "sys", "json"))
+        assert result == ("json", "os", "sys")
+
+    @pytest.mark.unit
+    def test_sorted_imports_returned_as_is(self):
+        """已有序且唯一的导入直接返回"""
+        imports = ("json", "os", "sys")
+        assert _organize_imports_impl(imports) is imports
+
+
+class TestBraceBodyEnd:
+    """大括号语法体检测测试"""
+
+    @pytest.mark.unit
+    def test_line_comment_does_not_hide_closing_brace(self):
+        """行注释只影响当前行，后续大括号仍参与计数"""
+        lines = [
+            "int main() {",
+            "    // setup {",
+            '    char *s = "}";',
+            "    /* block } */",
+            "}",
+            "int other() {}",
+        ]
+        assert _detect_brace_body_end_improved(lines, 0) == 6
+
+
+class TestFileCache:
+    """文件内容缓存测试"""
+
+    @pytest.mark.unit
+    def test_cache_hit_and_invalidation(self, tmp_path):
+        """未修改时命中缓存，修改或显式失效后重新读取"""
+        source = tmp_path / "main.c"
+        source.write_bytes(b"int main() {\r\n}\r\n")
+
+        raw, lines = _read_file_cached(source)
+        assert raw == b"int main() {\r\n}\r\n"
+        assert lines == ["int main() {", "}", ""]
+        assert _read_file_cached(source)[1] is lines
+
+        source.write_bytes(b"int main() {\n  return 0;\n}\n")
+        assert _read_file_cached(source)[1] == ["int main() {", "  return 0;", "}", ""]
+
+        cached = _read_file_cached(source)[1]
+        _invalidate_file_cache(source)
+        assert _read_file_cached(source)[1] is not cached
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_lone_cr_ends_line_like_read_text(self, tmp_path, monkeypatch, stream):
+        """单独的CR与read_text一样视为行结束，缓存与流式窗口一致"""
+        if stream:
+            monkeypatch.setattr(mcp_tools, "_FILE_CACHE_MAX_FILE_BYTES", 0)
+        source = tmp_path / "main.c"
+        source.write_bytes(b"a\rb\r\nc\nd\r")
+        expected = source.read_text().split("\n")
+        _invalidate_file_cache(source)
+
+        assert _read_line_window(source, 1, 4) == (expected[1:4], 5)
+        assert _read_file_cached(source)[1] == expected == ["a", "b", "c", "d", ""]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_line_window_matches_full_split(self, tmp_path, monkeypatch, stream):
+        """窗口读取与全文件切片结果一致，包括末尾空行；超大文件流式读取"""
+        if stream:
+            monkeypatch.setattr(mcp_tools, "_FILE_CACHE_MAX_FILE_BYTES", 0)
+        source = tmp_path / "main.py"
+        source.write_bytes(b"a\r\nb\nc\n")
+        _invalidate_file_cache(source)
+
+        assert _read_line_window(source, 1, 3) == (["b", "c"], 4)
+        assert (str(source) in mcp_tools._file_cache) is not stream
+        assert _read_line_window(source, 2, None) == (["c", ""], 4)
+        assert _read_line_window(source, 10, 20) == ([], 4)
+
+        # 负数结束位置按列表切片语义，与是否已缓存无关
+        _invalidate_file_cache(source)
+        assert _read_line_window(source, 0, -1) == (["a", "b", "c"], 4)
+        assert _read_line_window(source, 1, -2) == (["b"], 4)
+
+
+class TestRefreshIndex:
+    """索引刷新测试"""
+
+    @pytest.mark.unit
+    def test_noop_refresh_keeps_caches(self, tmp_path):
+        """目录树无变更时不清空文件缓存和SCIP查询缓存"""
+        source = tmp_path / "main.py"
+        source.write_text("def main():\n    pass\n")
+        set_project_path(str(tmp_path))
+        tool_refresh_index()
+
+        _read_file_cached(source)
+        first = tool_find_scip_symbol("main")
+        result = tool_refresh_index()
+        assert result["method"] == "noop"
+        assert str(source) in mcp_tools._file_cache
+        assert tool_find_scip_symbol("main") is first
+
+
+class TestScipResultCache:
+    """SCIP查询结果缓存测试"""
+
+    @pytest.mark.unit
+    def test_cached_until_scip_data_changes(self, tmp_path):
+        """重复查询命中缓存，处理文件后重新计算"""
+        source = tmp_path / "main.py"
+        source.write_text("def main():\n    pass\n")
+        index = set_project_path(str(tmp_path))
+        index.add_file(str(source), FileInfo("python", 2, {}, []))
+
+        first = tool_find_scip_symbol("main")
+        assert first["success"]
+        assert tool_find_scip_symbol("main") is first
+
+        assert tool_process_file_with_scip(str(source))["success"]
+        second = tool_find_scip_symbol("main")
+        assert second is not first
+        assert second["match_count"] >= 1
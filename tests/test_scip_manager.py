@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+SCIP符号管理器测试 - 出现位置索引与流式导出
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core.scip import SCIPOccurrence, SCIPSymbolManager
+
+
+class TestScipOccurrenceIndex:
+    """SCIP出现位置反向索引测试"""
+
+    @pytest.mark.unit
+    def test_reprocessed_document_replaces_occurrences(self, tmp_path):
+        """重新处理文件时旧文档的出现位置被移除"""
+        manager = SCIPSymbolManager(str(tmp_path))
+        file_path = str(tmp_path / "main.py")
+        symbols = [{"name": "main", "type": "function", "line": 1, "column": 0}]
+
+        document = manager.process_file_symbols(file_path, "python", symbols)
+        symbol_id = document.symbols[0].symbol_id
+        manager.add_occurrence(
+            document,
+            SCIPOccurrence(symbol_id, document.file_path, 5, 4, "reference"),
+        )
+        assert len(manager.resolve_definitions(symbol_id)) == 1
+        assert len(manager.resolve_references(symbol_id)) == 1
+
+        manager.process_file_symbols(file_path, "python", symbols)
+        assert len(manager.resolve_definitions(symbol_id)) == 1
+        assert manager.resolve_references(symbol_id) == []
+
+
+class TestScipStreamExport:
+    """SCIP流式导出测试"""
+
+    @pytest.mark.unit
+    def test_stream_matches_full_export(self, tmp_path):
+        """流式写出的JSON与完整导出字典一致"""
+        manager = SCIPSymbolManager(str(tmp_path))
+        for name in ("a.py", "b.py"):
+            document = manager.process_file_symbols(
+                str(tmp_path / name), "python", [{"name": "main", "line": 1}]
+            )
+            document.external_symbols.add("os")
+
+        buffer = io.BytesIO()
+        summary = manager.export_scip_stream(buffer)
+        expected = json.loads(json.dumps(manager.export_scip_index()))
+        assert json.loads(buffer.getvalue()) == expected
+        assert summary["document_count"] == 2
+        assert summary["external_symbols_count"] == 1
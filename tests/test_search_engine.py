@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+搜索引擎测试 - 符号/文本/正则搜索、ripgrep流式解析与查询缓存
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core.index import CodeIndex, FileInfo, SearchQuery, SearchResult, SymbolInfo
+from core.search import SearchEngine, rg_executable
+from core.search_cache import AdvancedQueryCache
+from core import search, search_parallel
+from core.search_parallel import (
+    compile_regex_cached,
+    iter_file_blocks,
+    iter_matching_lines,
+    iter_regex_lines,
+    required_literal,
+)
+
+
+class TestSymbolPrefixSearch:
+    """符号前缀快速路径测试"""
+
+    @pytest.mark.unit
+    def test_prefix_path_matches_full_scan(self, tmp_path):
+        """精确+前缀命中填满limit时走二分，结果与全量扫描一致"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        for name in ("getX", "get", "Get", "forget", "getA", "GET_ALL"):
+            index.add_symbol(name, SymbolInfo(type="function", file="a.py", line=1))
+        engine = SearchEngine(index)
+        for case_sensitive in (True, False):
+            query = SearchQuery(
+                pattern="get", type="symbol", case_sensitive=case_sensitive, limit=2
+            )
+            fast = engine._search_symbol_prefix(query)
+            assert fast is not None
+            assert fast == engine._search_symbol_index(query)[:2]
+
+        query = SearchQuery(pattern="get", type="symbol", limit=None)
+        assert engine._search_symbol_prefix(query) is None
+
+    @pytest.mark.unit
+    def test_substring_fill_stops_at_limit(self, tmp_path):
+        """精确+前缀不足limit时只补足所需的子串匹配，顺序与全量扫描一致"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        for name in ("forget", "get", "target", "getX", "budget", "gadget"):
+            index.add_symbol(name, SymbolInfo(type="function", file="a.py", line=1))
+        engine = SearchEngine(index)
+        for limit in (1, 3, 4, 10):
+            query = SearchQuery(pattern="get", type="symbol", limit=limit)
+            full = engine._search_symbol_index(query)
+            assert engine._search_symbol_prefix(query) == full[:limit]
+        found = engine._search_symbol_prefix(query)
+        assert [m["symbol"] for m in found] == [
+            "get", "getX", "forget", "target", "budget", "gadget"
+        ]
+
+    @pytest.mark.unit
+    def test_substring_scan_on_joined_keys(self, tmp_path):
+        """拼接文本扫描按质量分桶；键含换行时回退逐个判断"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        for name in ("forget", "getX", "get"):
+            index.add_symbol(name, SymbolInfo(type="function", file="a.py", line=1))
+        engine = SearchEngine(index)
+        query = SearchQuery(pattern="get", type="symbol")
+        expected = ["get", "getX", "forget"]
+        assert [m["symbol"] for m in engine._search_symbol_index(query)] == expected
+
+        index.add_symbol("odd\nget", SymbolInfo(type="function", file="a.py", line=2))
+        assert index.symbol_key_text()[1] is None
+        found = [m["symbol"] for m in engine._search_symbol_index(query)]
+        assert found == expected + ["odd\nget"]
+
+
+class TestStreamedFileScan:
+    """超大文件分块流式扫描测试"""
+
+    @pytest.mark.unit
+    def test_blocks_match_cached_scan(self, tmp_path, monkeypatch):
+        """分块结果与整段读取一致，包括跨块的CRLF和超长行"""
+        source = tmp_path / "big.log"
+        source.write_bytes(b"foo bar\r\nlong" + b"x" * 50 + b"\rFoo\n\nend foo")
+        joined = "\n".join(block for _, block in iter_file_blocks(str(source), 4))
+        assert joined == source.read_text(encoding="utf-8", errors="ignore")
+
+        engine = SearchEngine(CodeIndex(base_path=str(tmp_path), files={}, symbols={}))
+        regex = re.compile(r"^foo|o$")
+        cached_text = list(engine._iter_text_hits("big.log", "foo", False))
+        cached_regex = list(engine._iter_regex_hits("big.log", regex))
+        monkeypatch.setattr(search_parallel, "_STREAM_MIN_BYTES", 0)
+        assert list(engine._iter_text_hits("big.log", "foo", False)) == cached_text
+        assert list(engine._iter_regex_hits("big.log", regex)) == cached_regex
+        assert [n for n, _ in cached_text] == [1, 3, 5]
+
+
+class TestParallelStop:
+    """并行块协作退出测试"""
+
+    @pytest.mark.unit
+    def test_chunks_stop_after_collector_is_done(self, tmp_path):
+        """收集结束后stop置位，运行中的块在下一个文件前退出"""
+        (tmp_path / "a.py").write_text("needle\n")
+        chunk = [("a.py", FileInfo("python", 1, {}, []))]
+        engine = SearchEngine(CodeIndex(base_path=str(tmp_path), files={}, symbols={}))
+        query = SearchQuery(pattern="needle", type="text")
+        stop = threading.Event()
+        assert len(engine._search_text_chunk(query, chunk, stop)) == 1
+
+        engine._collect_in_order([], None, stop)
+        assert stop.is_set()
+        assert engine._search_text_chunk(query, chunk, stop) == []
+
+
+class TestRipgrepStream:
+    """ripgrep流式解析测试 - 用Python子进程模拟rg输出"""
+
+    MATCH = json.dumps(
+        {
+            "type": "match",
+            "data": {
+                "path": {"text": "a.py"},
+                "lines": {"text": "  x = 1\n"},
+                "line_number": 3,
+            },
+        }
+    )
+
+    def _fake_rg(self, body):
+        return [sys.executable, "-c", f"import sys\nline = {self.MATCH!r}\n{body}"]
+
+    @pytest.mark.unit
+    def test_stops_process_once_limit_reached(self, tmp_path):
+        """无限输出的进程在读够limit条后被终止"""
+        engine = SearchEngine(CodeIndex(base_path=str(tmp_path), files={}, symbols={}))
+        cmd = self._fake_rg("while True:\n    print(line, flush=True)")
+        matches = engine._run_ripgrep_command(cmd, engine._parse_rg_output, 2, 10)
+        assert matches == [
+            {"file": "a.py", "line": 3, "content": "x = 1", "language": "unknown"}
+        ] * 2
+
+    @pytest.mark.unit
+    def test_exit_code_decides_fallback(self, tmp_path):
+        """完整读完时非0退出码返回None，坏行与非match事件被跳过"""
+        engine = SearchEngine(CodeIndex(base_path=str(tmp_path), files={}, symbols={}))
+        body = "print(line)\nprint('not json')\nprint('{\"type\": \"end\"}')"
+        parse = engine._parse_rg_output
+        assert len(engine._run_ripgrep_command(self._fake_rg(body), parse)) == 1
+        failing = self._fake_rg(body + "\nsys.exit(2)")
+        assert engine._run_ripgrep_command(failing, parse) is None
+
+    @pytest.mark.unit
+    def test_rg_path_follows_path_env(self, tmp_path, monkeypatch):
+        """rg路径按PATH缓存，PATH变化时重新查找"""
+        rg = tmp_path / "bin" / "rg"
+        rg.parent.mkdir()
+        rg.write_text("#!/bin/sh\n")
+        rg.chmod(0o755)
+        monkeypatch.setenv("PATH", str(rg.parent))
+        assert rg_executable() == str(rg)
+        monkeypatch.setenv("PATH", str(tmp_path))
+        assert rg_executable() is None
+
+    @pytest.mark.unit
+    def test_command_scope_and_regexp_order(self, tmp_path, monkeypatch):
+        """file_pattern转成--glob，超长行截断预览，--regexp紧挨模式"""
+        engine = SearchEngine(CodeIndex(base_path=str(tmp_path), files={}, symbols={}))
+        commands = []
+        monkeypatch.setattr(
+            engine, "_run_ripgrep_command", lambda cmd, *_: commands.append(cmd) or []
+        )
+        query = SearchQuery(
+            pattern="fo+", type="regex", file_pattern="*.py", case_sensitive=False
+        )
+        engine._search_regex_with_ripgrep(query)
+        engine._search_with_ripgrep(SearchQuery(pattern="foo"))
+        regex_cmd, text_cmd = commands
+        assert regex_cmd[-3:] == ["--regexp", "fo+", str(tmp_path)]
+        assert regex_cmd[regex_cmd.index("--glob") + 1] == "*.py"
+        assert "--max-columns-preview" in text_cmd and "--glob" not in text_cmd
+
+    @pytest.mark.unit
+    def test_null_separated_output(self, tmp_path):
+        """--null纯文本输出与JSON解析结果一致，非匹配提示行被跳过"""
+        engine = SearchEngine(CodeIndex(base_path=str(tmp_path), files={}, symbols={}))
+        output_args, parse = engine._rg_output_mode()
+        assert "--null" in output_args
+        raw = [b"a.py\x003:  x = 1\n", b"b.bin\x00binary file matches\n"]
+        raw.append(b"a.py\x0012:d = {'k': 1}\r\n")
+        matches = list(parse(raw))
+        assert [(m["file"], m["line"], m["content"]) for m in matches] == [
+            ("a.py", 3, "x = 1"),
+            ("a.py", 12, "d = {'k': 1}"),
+        ]
+        assert {m["language"] for m in matches} == {"unknown"}
+
+
+class TestFilePattern:
+    """file_pattern测试 - rg的--glob与Python fallback扫描同一批文件"""
+
+    PATTERNS = {
+        "*.py": ["a.py", "src/a.py"],
+        "a.py": ["a.py", "src/a.py"],
+        "**/a.py": ["a.py", "src/a.py"],
+        "src/*": ["src/a.py", "src/b.md"],
+        "!*.md": ["a.py", "src/a.py"],
+        "*.PY": [],
+    }
+
+    def _engine(self, tmp_path):
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        (tmp_path / "src").mkdir()
+        for name in ("a.py", "src/a.py", "src/b.md"):
+            (tmp_path / name).write_text("foo = 1\n")
+            index.add_file(name, FileInfo("python", 1, {}, []))
+        return SearchEngine(index)
+
+    def _files(self, engine, file_pattern, search_type="text"):
+        query = SearchQuery("foo", search_type, file_pattern=file_pattern)
+        if search_type == "text":
+            return sorted(m["file"] for m in engine._search_text(query))
+        return sorted(m["file"] for m in engine._search_regex(query))
+
+    @pytest.mark.unit
+    def test_fallback_follows_glob_semantics(self, tmp_path, monkeypatch):
+        """fallback的单线程/并行/正则路径都按rg glob语义过滤"""
+        monkeypatch.setattr(search, "rg_executable", lambda: None)
+        engine = self._engine(tmp_path)
+        for file_pattern, expected in self.PATTERNS.items():
+            assert self._files(engine, file_pattern) == expected, file_pattern
+            assert self._files(engine, file_pattern, "regex") == expected
+            query = SearchQuery("foo", "text", file_pattern=file_pattern)
+            parallel = engine.search_text_parallel(query)
+            assert sorted(m["file"] for m in parallel) == expected
+
+    @pytest.mark.unit
+    @pytest.mark.skipif(rg_executable() is None, reason="ripgrep not installed")
+    def test_rg_and_fallback_agree(self, tmp_path, monkeypatch):
+        """同一file_pattern查询，rg与fallback返回同一批文件"""
+        engine = self._engine(tmp_path)
+        with_rg = {p: self._files(engine, p) for p in self.PATTERNS}
+        monkeypatch.setattr(search, "rg_executable", lambda: None)
+        assert with_rg == {p: self._files(engine, p) for p in self.PATTERNS}
+
+
+class TestSymbolTypeDetection:
+    """符号类型规则表测试"""
+
+    @pytest.mark.unit
+    def test_first_matching_rule_wins(self, tmp_path):
+        """按规则顺序取首个命中，符号名中的正则元字符按字面处理"""
+        engine = SearchEngine(CodeIndex(base_path=str(tmp_path), files={}, symbols={}))
+        detect = engine._detect_symbol_type
+        assert detect("async def run(self):", "run", "python") == "function"
+        assert detect("from pkg import a.b", "a.b", "py") == "import"
+        assert detect("from pkg import axb", "a.b", "py") == "unknown"
+        assert detect("type Node struct {", "Node", "go") == "struct"
+        assert detect("#define MAX 10", "MAX", "cpp") == "macro"
+        assert detect("enum Color {", "Color", "ruby") == "class"
+        assert detect("x.def foo", "foo", "ruby") == "method"
+
+
+class TestIterMatchingLines:
+    """整段文本find扫描测试"""
+
+    @pytest.mark.unit
+    def test_matches_per_line_containment(self):
+        """每行至多命中一次，结果与逐行包含判断一致"""
+        lines = ["foo foo", "bar", "", "xfoo", "foo"]
+        text = "\n".join(lines)
+        for pattern in ("foo", "o", "", "bar", "missing", "foo\nbar"):
+            expected = [i for i, line in enumerate(lines) if pattern in line]
+            assert list(iter_matching_lines(text, pattern)) == expected
+
+    @pytest.mark.unit
+    def test_dense_hits_switch_to_line_scan(self):
+        """命中密集时切换逐行判断，结果不变"""
+        lines = ["x = 1", "y = 2", "", "value"] * 20
+        text = "\n".join(lines)
+        expected = [i for i, line in enumerate(lines) if "=" in line]
+        assert list(iter_matching_lines(text, "=")) == expected
+        assert list(iter_matching_lines(text, "=", lines)) == expected
+
+
+class TestRequiredLiteral:
+    """正则必含字面量提取测试"""
+
+    @pytest.mark.unit
+    def test_longest_top_level_literal(self):
+        """取顶层最长连续字面量，分支与忽略大小写时放弃"""
+        assert required_literal(r"def\s+foo_\w+\(") == "foo_"
+        assert required_literal(r"class (Foo|Bar)Manager") == "Manager"
+        assert required_literal(r"foo|bar") == ""
+        assert required_literal(r"(?i)foo") == ""
+        assert required_literal("foo", re.IGNORECASE) == ""
+
+    @pytest.mark.unit
+    def test_prefilter_disabled_without_parser(self, monkeypatch):
+        """re私有解析器不可用时不预筛，正则命中行不受影响"""
+        monkeypatch.setattr(search_parallel, "_SRE_PARSER_AVAILABLE", False)
+        required_literal.cache_clear()
+        try:
+            assert required_literal(r"def\s+bar_\w+") == ""
+            lines = ["def bar_x():", "bar_y"]
+            regex = re.compile(r"def\s+bar_\w+")
+            assert list(iter_regex_lines(regex, lines, "\n".join(lines))) == [0]
+        finally:
+            required_literal.cache_clear()
+
+
+class TestIterRegexLines:
+    """正则命中行测试"""
+
+    @pytest.mark.unit
+    def test_matches_per_line_search(self):
+        """字面量预筛与C层逐行search结果都与逐行regex.search一致"""
+        lines = ["def foo(x):", "  foo = 1", "", "def bar():", "foo"]
+        text = "\n".join(lines)
+        for pattern in (r"def\s+foo", r"foo$", r"^\s", r"(?i)FOO", r"o\Z"):
+            regex = re.compile(pattern)
+            expected = [i for i, line in enumerate(lines) if regex.search(line)]
+            assert list(iter_regex_lines(regex, lines, text)) == expected
+            assert list(iter_regex_lines(regex, lines)) == expected
+
+    @pytest.mark.unit
+    def test_compile_cache_shared_and_invalid(self, tmp_path):
+        """同一(模式, 大小写)复用编译结果，非法模式返回None，正则搜索返回空"""
+        regex = compile_regex_cached(r"def\s+foo", False)
+        assert regex is compile_regex_cached(r"def\s+foo", False)
+        assert regex.flags & re.IGNORECASE
+        assert compile_regex_cached("foo(bar[", True) is None
+        engine = SearchEngine(CodeIndex(base_path=str(tmp_path), files={}, symbols={}))
+        assert engine._search_regex(SearchQuery(pattern="foo(", type="regex")) == []
+
+
+class TestQueryResultCache:
+    """查询结果缓存测试"""
+
+    @pytest.mark.unit
+    def test_generation_invalidates_and_lru_evicts(self, tmp_path):
+        """索引变更即失效，容量满时淘汰最久未用的条目"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        cache = AdvancedQueryCache(max_cache_entries=2)
+        queries = [SearchQuery(pattern=name, type="symbol") for name in "abc"]
+        results = [SearchResult([], 0, 0.0) for _ in queries]
+
+        cache.cache_query_result(queries[0], results[0], index)
+        cache.cache_query_result(queries[1], results[1], index)
+        assert cache.get_query_result(queries[0], index) is results[0]
+        cache.cache_query_result(queries[2], results[2], index)
+        assert cache.get_query_result(queries[1], index) is None
+        assert cache.get_query_result(queries[0], index) is results[0]
+
+        index.add_file("new.py", FileInfo("python", 1, {}, []))
+        assert cache.get_query_result(queries[0], index) is None
+
+    @pytest.mark.unit
+    def test_reuses_covering_limit(self, tmp_path):
+        """截断的结果回答更小limit；未截断的结果回答任意limit"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        cache = AdvancedQueryCache()
+        rows = [{"symbol": str(n)} for n in range(5)]
+        cache.cache_query_result(
+            SearchQuery("a", "symbol", limit=5), SearchResult(rows, 5, 0.0), index
+        )
+        cache.cache_query_result(
+            SearchQuery("b", "symbol", limit=10), SearchResult(rows, 5, 0.0), index
+        )
+
+        def cached(pattern, limit):
+            query = SearchQuery(pattern, "symbol", limit=limit)
+            result = cache.get_query_result(query, index)
+            return None if result is None else result.matches
+
+        assert cached("a", 2) == rows[:2]
+        assert cached("a", 6) is None
+        assert cached("a", None) is None
+        assert cached("b", 100) == rows
+        assert cached("b", None) == rows
+
+    @pytest.mark.unit
+    def test_dependency_edit_seen_on_immediate_hit(self, tmp_path):
+        """紧接着的重复查询也校验依赖文件，编辑后的内容立即可见"""
+        source = tmp_path / "a.py"
+        source.write_text("foo = 1\n")
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        index.add_file("a.py", FileInfo("python", 1, {}, []))
+        engine = SearchEngine(index)
+        query = SearchQuery(pattern="foo", type="text")
+        assert engine.search(query).total_count == 1
+
+        source.write_text("foo = 1\nfoo = 2\n")
+        assert engine.search(query).total_count == 2
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+语义操作测试 - 依赖分析、引用与调用者查询
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core.index import CodeIndex, FileInfo, SymbolInfo
+from core.operations import SemanticOperations
+from core.semantic_ops import caller_matches, reference_matches
+
+
+class TestImportsIndex:
+    """导入反向索引测试"""
+
+    @pytest.mark.unit
+    def test_used_by_follows_file_changes(self, tmp_path):
+        """used_by按文件顺序返回，文件增删后重新计算"""
+        index = CodeIndex(base_path=str(tmp_path), files={}, symbols={})
+        index.add_file("lib.py", FileInfo("python", 1, {}, [], ["helper", "Config"]))
+        index.add_file("app.py", FileInfo("python", 1, {}, ["Config", "helper"]))
+        index.add_file("cli.py", FileInfo("python", 1, {}, ["os"]))
+        ops = SemanticOperations(index)
+        assert ops.analyze_file_dependencies("lib.py")["used_by"] == ["app.py"]
+
+        index.add_file("cli.py", FileInfo("python", 1, {}, ["helper"]))
+        index.remove_file("app.py")
+        assert ops.analyze_file_dependencies("lib.py")["used_by"] == ["cli.py"]
+
+
+class TestReferenceMatches:
+    """引用结果测试"""
+
+    @pytest.mark.unit
+    def test_limit_stops_parsing(self):
+        """limit只取前几条，跳过无行号的记录"""
+        info = SymbolInfo(
+            type="function", file="a.py", line=1, references=["b.py", "c.py:3:7"]
+        )
+        info.references += [f"d.py:{n}" for n in range(10)]
+        matches = reference_matches("f", info, limit=2)
+        assert [(m["file"], m["line"]) for m in matches] == [("c.py", 3), ("d.py", 0)]
+        assert len(reference_matches("f", info)) == 11
+
+    @pytest.mark.unit
+    def test_caller_limit_skips_missing(self):
+        """调用者只数仍在索引中的，取够limit即停"""
+        symbols = {
+            name: SymbolInfo(type="function", file="a.py", line=n)
+            for n, name in enumerate(("a", "b", "c"))
+        }
+        info = SymbolInfo(type="function", file="a.py", line=9)
+        info.called_by = ["x", "b", "c", "a"]
+        found = caller_matches(symbols, info, limit=2)
+        assert [(m["symbol"], m["line"]) for m in found] == [("b", 1), ("c", 2)]
+        assert len(caller_matches(symbols, info)) == 3